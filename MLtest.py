@@ -1,62 +1,94 @@
+import argparse
+import os
+import queue
+import time
+
 import cv2
-from ultralytics import YOLO
+import torch
 
-model = YOLO("emotionsbest.pt")
+from emotion.faces import load_face_cascade
+from emotion.pipeline import EmotionPipeline
+from emotion.runtime import RUNTIME_BACKENDS, create_classifier, runtime_config
+from emotion.smoothing import EmotionSmoother
+from emotion.tracker import FaceTracker
 
-# Загружаем встроенный в OpenCV быстрый детектор лиц (Haar Cascade)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+config = runtime_config()
+parser = argparse.ArgumentParser(description="EmSana Pro Emotion Detection")
+parser.add_argument("--weights", default="emotionsbest.pt")
+parser.add_argument("--backend", choices=RUNTIME_BACKENDS, default=config["backend"], help="рантайм модели (PyTorch - запасной)")
+parser.add_argument("--imgsz", type=int, default=config["imgsz"], help="размер входа модели для лиц")
+parser.add_argument("--int8", action="store_true", default=config["int8"], help="INT8-квантование для ONNX/OpenVINO")
+parser.add_argument("--camera", type=int, default=0)
+parser.add_argument("--workers", type=int, default=2, help="потоков классификации")
+parser.add_argument("--detect-every", type=int, default=5, help="полный Haar раз в N кадров (1 = каждый кадр)")
+parser.add_argument("--search-padding", type=float, default=0.5, help="запас области поиска вокруг лица (доля размера)")
+parser.add_argument("--reclassify-every", type=int, default=10, help="переклассифицировать неизменное лицо раз в K кадров")
+parser.add_argument("--smooth-alpha", type=float, default=0.4, help="вес нового ответа модели в сглаживании (1 = без сглаживания)")
+parser.add_argument("--stats-every", type=float, default=0, help="печатать счетчики стадий раз в N секунд")
+args = parser.parse_args()
 
-cap = cv2.VideoCapture(0)
-print("Камера запущена! Чтобы выйти, нажми 'q'.")
+# Делим ядра между воркерами, чтобы потоки torch не мешали друг другу
+torch.set_num_threads(max(1, (os.cpu_count() or 1) // args.workers))
+
+
+def load_classifier():
+    # Все лица кадра классифицируются одним батчем (один прямой проход YOLO на кадр)
+    return create_classifier(args.weights, args.backend, args.imgsz, args.int8, config["int8_data"], conf=0.45)
 
-while cap.isOpened():
-    success, frame = cap.read()
-    if not success:
-        break
 
-    # Переводим кадр в ЧБ для поиска лица
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+first_classifier = load_classifier()
+# Воркеры стартуют одновременно: модель берется из очереди атомарно, а не проверкой списка
+preloaded = queue.Queue()
+preloaded.put(first_classifier)
 
-    # ШАГ 1: Ищем все лица в кадре (работает на любом расстоянии)
-    faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(50, 50))
 
-    # Перебираем найденные лица
-    for (x, y, w, h) in faces:
-        # Немного расширяем рамку захвата, чтобы лицо влезло целиком
-        margin = int(h * 0.1)
-        y1, y2 = max(0, y - margin), min(frame.shape[0], y + h + margin)
-        x1, x2 = max(0, x - margin), min(frame.shape[1], x + w + margin)
+def make_classifier():
+    # Первый воркер берет уже загруженную модель, остальные загружают свою копию
+    try:
+        return preloaded.get_nowait()
+    except queue.Empty:
+        return load_classifier()
 
-        # Вырезаем лицо из кадра
-        face_crop = frame[y1:y2, x1:x2]
-        if face_crop.size == 0:
+
+def draw(frame, emotions):
+    for (x1, y1, x2, y2), result in emotions:
+        # Если YOLO не нашла эмоцию на этом лице, пропускаем его
+        if result is None:
             continue
 
-        # Делаем вырезанное лицо черно-белым (как в датасете)
-        face_gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY)
-        face_gray_3c = cv2.cvtColor(face_gray, cv2.COLOR_GRAY2BGR)
+        # Рисуем красивую рамку и подписываем эмоцию на оригинальном видео
+        label = f"{result.name} {result.conf:.2f}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+
+# Загружаем встроенный в OpenCV быстрый детектор лиц (Haar Cascade)
+face_cascade = load_face_cascade()
+# Между полными поисками лица ведутся трекером в небольшой области вокруг прошлой рамки
+tracker = FaceTracker(face_cascade, detect_every=args.detect_every, search_padding=args.search_padding)
+
+cap = cv2.VideoCapture(args.camera)
+print("Камера запущена! Чтобы выйти, нажми 'q'.")
 
-        # ШАГ 2: Отправляем в YOLO ТОЛЬКО вырезанное лицо
-        # verbose=False отключает спам в консоль
-        results = model.predict(source=face_gray_3c, conf=0.45, device='cpu', verbose=False)
+# Эмоция каждого лица сглаживается по кадрам, неизменное лицо не классифицируется заново
+smoother = EmotionSmoother(first_classifier.names, alpha=args.smooth_alpha, reclassify_every=args.reclassify_every)
 
-        # Если YOLO нашла эмоцию, достаем её название
-        if len(results[0].boxes) > 0:
-            # Берем самую уверенную эмоцию
-            best_box = results[0].boxes[0] 
-            class_id = int(best_box.cls[0])
-            conf = float(best_box.conf[0])
-            emotion_name = model.names[class_id]
+# Захват, поиск лиц, классификация и отрисовка работают параллельно
+pipeline = EmotionPipeline(cap, tracker, make_classifier, workers=args.workers, smoother=smoother).start()
+last_stats = time.monotonic()
 
-            # Рисуем красивую рамку и подписываем эмоцию на оригинальном видео
-            label = f"{emotion_name} {conf:.2f}"
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+while pipeline.running:
+    frame = pipeline.render(draw)
+    if frame is not None:
+        cv2.imshow("EmSana Pro Emotion Detection", frame)
 
-    cv2.imshow("EmSana Pro Emotion Detection", frame)
+    if args.stats_every and time.monotonic() - last_stats >= args.stats_every:
+        print(pipeline.snapshot())
+        last_stats = time.monotonic()
 
     if cv2.waitKey(1) & 0xFF == ord("q"):
         break
 
+pipeline.stop()
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+cv2.destroyAllWindows()
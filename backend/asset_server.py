@@ -0,0 +1,178 @@
+import json
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import Dict
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+# Те же файлы, что собирают tools/build_manifest.py и tools/build_derivatives.py
+ASSETS_DIR = Path(os.getenv("EMSANA_ASSETS_DIR", ROOT_DIR / "assets"))
+MANIFEST_PATH = ASSETS_DIR / "manifest.json"
+DERIVED_DIR = ASSETS_DIR / "_derived"
+# Файл по хешу никогда не меняется: кешировать можно навсегда
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Манифест меняется при выкладке: клиент перепроверяет его по ETag
+MANIFEST_CACHE = "no-cache"
+RANGE_CHUNK = 64 * 1024
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+router = APIRouter()
+
+
+class ManifestDiffRequest(BaseModel):
+    # {card_id: card hash} из манифеста, который уже есть у клиента
+    cards: Dict[str, str] = {}
+
+
+class AssetIndex:
+    """Манифест и таблица sha256 -> файл, перечитываются при смене manifest.json."""
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = Path(manifest_path)
+        self.manifest = None
+        self.files = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _collect(self, manifest):
+        files = {}
+        for card in manifest["cards"].values():
+            media = [card["image"]] if card["image"] else []
+            media += card["audio"].values()
+            for entry in media:
+                files[entry["hash"]] = ASSETS_DIR / entry["path"]
+                for variant in entry.get("variants", ()):
+                    if "hash" in variant:
+                        files[variant["hash"]] = DERIVED_DIR / variant["path"]
+        return files
+
+    def current(self):
+        """-> манифест или None, если он еще не собран."""
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self.files = self._collect(manifest)
+                self.manifest = manifest
+                self._mtime = mtime
+            return self.manifest
+
+    def path_for(self, digest):
+        self.current()
+        return self.files.get(digest)
+
+
+asset_index = AssetIndex()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def parse_range(header, size):
+    """-> (start, end) включительно, None для неподдерживаемого заголовка, ValueError - вне файла."""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Несколько диапазонов сразу не поддерживаем: отдаем файл целиком
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+async def read_range(path, start, length):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(RANGE_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.get("/assets/manifest")
+async def get_manifest(request: Request):
+    manifest = await anyio.to_thread.run_sync(asset_index.current)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Manifest is not built")
+    etag = f'"{manifest["content_hash"]}"'
+    headers = {"ETag": etag, "Cache-Control": MANIFEST_CACHE}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(asset_index.manifest_path, media_type="application/json", headers=headers)
+
+
+@router.post("/assets/manifest/diff")
+async def diff_manifest(data: ManifestDiffRequest):
+    """Только карточки, изменившиеся с прошлой синхронизации клиента, и ID удаленных."""
+    manifest = await anyio.to_thread.run_sync(asset_index.current)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Manifest is not built")
+    cards = manifest["cards"]
+    return JSONResponse({
+        "version": manifest["version"],
+        "content_hash": manifest["content_hash"],
+        "changed": [card for card_id, card in cards.items() if data.cards.get(card_id) != card["hash"]],
+        "removed": [card_id for card_id in data.cards if card_id not in cards],
+        "categories": manifest["categories"],
+    })
+
+
+@router.get("/assets/{digest}")
+async def get_asset(digest: str, request: Request):
+    """Файл по sha256 содержимого (с расширением или без): /assets/<hash>.jpg."""
+    digest = digest.split(".", 1)[0]
+    if not HASH_PATTERN.match(digest):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = await anyio.to_thread.run_sync(asset_index.path_for, digest)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE, "Accept-Ranges": "bytes"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        size = path.stat().st_size
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            return StreamingResponse(
+                read_range(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(length)},
+            )
+
+    # Целиком - через FileResponse: сервер, умеющий pathsend/sendfile, отдаст файл без копирования
+    return FileResponse(path, headers=headers)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+
+# Сколько живет одна попытка входа через Google, секунд
+AUTH_STATE_TTL = int(os.getenv("AUTH_STATE_TTL", "600"))
+# Как часто Redis-хранилище перечитывает попытку при ожидании, секунд
+REDIS_POLL_INTERVAL = 0.2
+
+
+class InMemoryAuthStateStore:
+    """Состояния попыток OAuth-входа в памяти процесса, с истечением по TTL.
+
+    Каждая попытка получает свой непрозрачный state ID, поэтому одновременные
+    входы разных пользователей не пересекаются. Просроченные записи
+    вычищаются по ходу работы, не чаще раза в sweep_interval секунд.
+    Ожидающие результата (long-poll) будятся сразу, как только попытка
+    завершилась, даже если update() вызван из другого потока.
+
+    API асинхронный, как и у Redis-хранилища: маршруты вызывают его через
+    await и не знают, какое хранилище настроено. Здесь методы не ждут
+    ничего, кроме замка на доли микросекунды.
+    """
+
+    def __init__(self, ttl=AUTH_STATE_TTL, sweep_interval=30):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._items = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _sweep(self, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        for state in [s for s, (expires, _) in self._items.items() if expires <= now]:
+            del self._items[state]
+
+    async def create(self, data):
+        state = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._items[state] = (now + self.ttl, dict(data))
+        return state
+
+    async def get(self, state):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            item = self._items.get(state)
+            if item is None or item[0] <= now:
+                return None
+            return dict(item[1])
+
+    async def update(self, state, **fields):
+        """Обновляет поля попытки; False, если такой попытки нет или она истекла."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(state)
+            if item is None or item[0] <= now:
+                return False
+            item[1].update(fields)
+            waiters = list(self._waiters.get(state, ())) if item[1].get("status") != "waiting" else []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+        return True
+
+    async def pop(self, state):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.pop(state, None)
+            if item is None or item[0] <= now:
+                return None
+            return item[1]
+
+    async def wait_result(self, state, timeout):
+        """Ждет до timeout секунд завершения попытки. Завершенную попытку забирает из хранилища.
+
+        None - попытки нет или она истекла.
+        """
+        attempt = await self.get(state)
+        if attempt is None:
+            return None
+        if attempt["status"] != "waiting":
+            return await self.pop(state)
+        if timeout <= 0:
+            return attempt
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.setdefault(state, []).append(waiter)
+        try:
+            # Попытка могла завершиться между get() и регистрацией ожидания
+            if await self.get(state) == attempt:
+                await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(state, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(state, None)
+        attempt = await self.get(state)
+        if attempt is not None and attempt["status"] != "waiting":
+            return await self.pop(state)
+        return attempt
+
+
+class RedisAuthStateStore:
+    """То же хранилище поверх Redis-совместимого сервера (несколько процессов бэкенда).
+
+    client - redis.asyncio.Redis: запросы к Redis не блокируют event loop.
+    """
+
+    def __init__(self, client, ttl=AUTH_STATE_TTL, prefix="emsana:auth:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def create(self, data):
+        state = secrets.token_urlsafe(24)
+        await self.client.set(self.prefix + state, json.dumps(data), ex=self.ttl)
+        return state
+
+    async def get(self, state):
+        raw = await self.client.get(self.prefix + state)
+        return json.loads(raw) if raw else None
+
+    async def update(self, state, **fields):
+        key = self.prefix + state
+        raw = await self.client.get(key)
+        if not raw:
+            return False
+        data = json.loads(raw)
+        data.update(fields)
+        # keepttl: попытка истекает в исходное время, а не продлевается
+        return bool(await self.client.set(key, json.dumps(data), keepttl=True, xx=True))
+
+    async def pop(self, state):
+        key = self.prefix + state
+        async with self.client.pipeline() as pipe:
+            pipe.get(key)
+            pipe.delete(key)
+            raw, _ = await pipe.execute()
+        return json.loads(raw) if raw else None
+
+    async def wait_result(self, state, timeout):
+        # Между процессами событие не передать: перечитываем попытку с коротким интервалом
+        deadline = time.monotonic() + timeout
+        while True:
+            attempt = await self.get(state)
+            if attempt is not None and attempt["status"] != "waiting":
+                return await self.pop(state)
+            if attempt is None or time.monotonic() >= deadline:
+                return attempt
+            await asyncio.sleep(min(REDIS_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def create_auth_state_store():
+    # AUTH_STATE_REDIS_URL (например, redis://127.0.0.1:6379/0) включает общее хранилище
+    redis_url = os.getenv("AUTH_STATE_REDIS_URL")
+    if redis_url:
+        import redis.asyncio
+        return RedisAuthStateStore(redis.asyncio.Redis.from_url(redis_url))
+    return InMemoryAuthStateStore()
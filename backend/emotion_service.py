@@ -0,0 +1,197 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+# Модели и препроцессинг лежат в пакете emotion в корне репозитория
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+# ML-зависимости нужны только для эмоций: без них auth-бэкенд должен работать как раньше
+try:
+    import cv2
+    import numpy as np
+    from emotion.faces import detect_faces, load_face_cascade
+    from emotion.runtime import create_classifier, runtime_config
+except ImportError as e:
+    EMOTION_IMPORT_ERROR = e
+else:
+    EMOTION_IMPORT_ERROR = None
+
+EMOTION_WEIGHTS = os.getenv("EMOTION_WEIGHTS", str(ROOT_DIR / "emotionsbest.pt"))
+# Сколько лиц максимум уходит в один прямой проход модели
+EMOTION_MAX_BATCH = int(os.getenv("EMOTION_MAX_BATCH", "16"))
+# Сколько ждем, пока батч наберется, прежде чем запускать неполный
+EMOTION_MAX_WAIT_MS = float(os.getenv("EMOTION_MAX_WAIT_MS", "10"))
+# Сколько лиц может ждать модель; сверх этого кадры отклоняются, а не копятся в памяти
+EMOTION_MAX_QUEUE = int(os.getenv("EMOTION_MAX_QUEUE", "256"))
+
+router = APIRouter()
+
+
+class BatcherOverloaded(Exception):
+    """Очередь модели полна: кадр нужно отклонить (аналог HTTP 503)."""
+
+
+class MicroBatcher:
+    """Собирает лица от всех сессий в общие батчи для одной модели.
+
+    Батч отправляется, как только набралось max_batch лиц или с момента
+    первого лица прошло max_wait_ms. Модель работает в отдельном потоке,
+    чтобы не блокировать event loop. Очередь ограничена max_queue лицами:
+    при перегрузке classify_all() сразу бросает BatcherOverloaded.
+    """
+
+    def __init__(self, classifier, max_batch=EMOTION_MAX_BATCH, max_wait_ms=EMOTION_MAX_WAIT_MS, max_queue=EMOTION_MAX_QUEUE):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.faces = 0
+        self.rejected = 0
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def classify_all(self, crops):
+        """Результаты для всех лиц кадра; BatcherOverloaded, если они не помещаются в очередь.
+
+        Кадр принимается целиком или не принимается: между проверкой места
+        и постановкой в очередь нет await, так что место не займут другие.
+        """
+        if self._queue.maxsize and self._queue.qsize() + len(crops) > self._queue.maxsize:
+            self.rejected += 1
+            raise BatcherOverloaded(f"{self._queue.qsize()} faces already queued")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for crop in crops:
+            future = loop.create_future()
+            self._queue.put_nowait((crop, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Сессия могла отключиться, пока лицо ждало в очереди
+            batch = [(crop, future) for crop, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await asyncio.to_thread(self.classifier.classify_crops, [crop for crop, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.faces += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+batcher = None
+# Haar Cascade не рассчитан на одновременный вызов из нескольких потоков: у каждого потока свой
+_local = threading.local()
+
+
+def _face_cascade():
+    if not hasattr(_local, "face_cascade"):
+        _local.face_cascade = load_face_cascade()
+    return _local.face_cascade
+
+
+def start_emotion_service():
+    global batcher
+    if EMOTION_IMPORT_ERROR is not None:
+        print(f"❌ Ошибка: сервис эмоций отключен, нет зависимостей: {EMOTION_IMPORT_ERROR}")
+        return
+    # Модель загружается один раз на процесс, а не на каждое подключение.
+    # Рантайм (torch/onnx/openvino) выбирается через EMOTION_BACKEND и соседние переменные
+    try:
+        classifier = create_classifier(EMOTION_WEIGHTS, conf=0.45, **runtime_config())
+    except Exception as e:
+        print(f"❌ Ошибка: модель эмоций не загружена ({EMOTION_WEIGHTS}): {e}")
+        return
+    batcher = MicroBatcher(classifier)
+    batcher.start()
+
+
+async def stop_emotion_service():
+    if batcher is not None:
+        await batcher.stop()
+
+
+def _face_crops(image, mode):
+    # Лица классифицируются черно-белыми (как в датасете)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if mode == "face":
+        return [(None, gray)]
+    crops = batcher.classifier.crop_faces(gray, detect_faces(_face_cascade(), gray))
+    return [(box, crop) for _, box, crop in crops]
+
+
+def _result_json(box, result):
+    return {
+        "box": list(box) if box is not None else None,
+        "emotion": result.name if result is not None else None,
+        "confidence": round(result.conf, 4) if result is not None else None,
+    }
+
+
+@router.websocket("/ws/emotion")
+async def emotion_stream(websocket: WebSocket, mode: str = "frame"):
+    # mode=frame: присылаются целые JPEG-кадры, лица ищем на сервере
+    # mode=face: каждый JPEG - уже вырезанное лицо
+    await websocket.accept()
+    if batcher is None:
+        await websocket.close(code=1011, reason="Emotion model is not loaded")
+        return
+    frame_index = 0
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            start = time.perf_counter()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                await websocket.send_json({"frame": frame_index, "error": "Invalid JPEG"})
+                frame_index += 1
+                continue
+            crops = await asyncio.to_thread(_face_crops, image, mode)
+            try:
+                results = await batcher.classify_all([crop for _, crop in crops])
+            except BatcherOverloaded:
+                # Кадр выбрасываем: клиент пришлет следующий, более свежий
+                await websocket.send_json({"frame": frame_index, "error": "Server overloaded", "code": 503})
+                frame_index += 1
+                continue
+            await websocket.send_json({
+                "frame": frame_index,
+                "faces": [_result_json(box, result) for (box, _), result in zip(crops, results)],
+                "latency_ms": round((time.perf_counter() - start) * 1000.0, 2),
+            })
+            frame_index += 1
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+
+import httpx
+
+from upstream import upstream
+
+try:
+    import jwt
+except ImportError:
+    jwt = None
+
+# Legacy-проекты Supabase подписывают токены общим секретом (HS256),
+# новые - асимметричными ключами, опубликованными в JWKS
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+# Не чаще раза в столько секунд перечитываем JWKS при неизвестном kid
+JWKS_MIN_REFRESH_INTERVAL = 30
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+
+class TokenInvalid(Exception):
+    """Токен точно недействителен: подпись, срок, аудитория или издатель не сходятся."""
+
+
+class VerifierUnavailable(Exception):
+    """Локально проверить нельзя (нет секрета/ключа/PyJWT) - нужен запасной путь."""
+
+
+class LocalJWTVerifier:
+    """Проверяет access token Supabase без сетевого запроса на каждый вызов.
+
+    Ключи JWKS загружаются один раз и кешируются; при встрече неизвестного
+    kid (ротация ключей) список перечитывается, но не чаще
+    JWKS_MIN_REFRESH_INTERVAL.
+    """
+
+    def __init__(self, supabase_url, api_key, jwt_secret=SUPABASE_JWT_SECRET, audience=SUPABASE_JWT_AUDIENCE):
+        self.issuer = f"{supabase_url.rstrip('/')}/auth/v1"
+        self.jwks_url = f"{self.issuer}/.well-known/jwks.json"
+        self.api_key = api_key
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+
+    async def refresh_keys(self):
+        async with self._lock:
+            if self._fetched_at is not None and time.monotonic() - self._fetched_at < JWKS_MIN_REFRESH_INTERVAL:
+                return
+            self._fetched_at = time.monotonic()
+            async with httpx.AsyncClient() as client:
+                res = await upstream("jwks", client.get(self.jwks_url, headers={"apikey": self.api_key}))
+            res.raise_for_status()
+            keys = {}
+            for jwk in res.json().get("keys", []):
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+                except jwt.PyJWTError:
+                    continue
+            self._keys = keys
+
+    async def _signing_key(self, header):
+        alg = header.get("alg")
+        if alg == "HS256":
+            if not self.jwt_secret:
+                raise VerifierUnavailable("SUPABASE_JWT_SECRET is not set")
+            return self.jwt_secret
+        if alg not in ASYMMETRIC_ALGORITHMS:
+            raise TokenInvalid(f"Unsupported JWT algorithm: {alg}")
+        kid = header.get("kid")
+        if kid not in self._keys:
+            try:
+                await self.refresh_keys()
+            except Exception as e:
+                raise VerifierUnavailable(f"Cannot fetch JWKS: {e}")
+        if kid not in self._keys:
+            raise VerifierUnavailable(f"Unknown signing key: {kid}")
+        return self._keys[kid].key
+
+    async def verify(self, token):
+        """-> claims токена. TokenInvalid / VerifierUnavailable, если не удалось."""
+        if jwt is None:
+            raise VerifierUnavailable("PyJWT is not installed")
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenInvalid(str(e))
+        key = await self._signing_key(header)
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[header["alg"]],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenInvalid(str(e))
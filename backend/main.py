@@ -1,18 +1,25 @@
+import asyncio
 import os
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
 from fastapi.responses import HTMLResponse
 from typing import Optional
 from dotenv import load_dotenv
+from auth_state import create_auth_state_store
+from upstream import upstream
+from jwt_verify import LocalJWTVerifier, TokenInvalid, VerifierUnavailable
+from session_cache import SessionCache, token_claims
+from emotion_service import router as emotion_router, start_emotion_service, stop_emotion_service
+from asset_server import router as asset_router
+import metrics
 
 # Secret Key
 load_dotenv()
-SUPABASE_URL = "https://ezhetuwzvcuynhzdgflk.supabase.co"
-SUPABASE_KEY = "sb_publishable_wWTgfp7z7IypTS4D6U7c8g_UYdPEsme"
-
-# Инициализация обычного клиента
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# SUPABASE_URL можно переопределить, например, на локальный стенд для нагрузочных тестов
+SUPABASE_URL = os.getenv("SUPABASE_URL", "https://ezhetuwzvcuynhzdgflk.supabase.co")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "sb_publishable_wWTgfp7z7IypTS4D6U7c8g_UYdPEsme")
 
 # Подтягиваем Secret Key из .env для админ-функций
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
@@ -20,10 +27,31 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 if not SUPABASE_SERVICE_KEY:
     print("❌ Ошибка: SUPABASE_SERVICE_KEY не найден в .env файле!")
 
-# Админ-клиент для сброса паролей
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY) if SUPABASE_SERVICE_KEY else None
+# Асинхронные клиенты создаются при старте, один на процесс, с общим пулом соединений.
+# Обычный клиент - для входа/регистрации, админ-клиент - для сброса паролей
+supabase: Optional[AsyncClient] = None
+supabase_admin: Optional[AsyncClient] = None
 
 app = FastAPI()
+app.include_router(emotion_router)
+app.include_router(asset_router)
+app.include_router(metrics.router)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.on_event("startup")
+async def on_startup():
+    global supabase, supabase_admin
+    # Клиент общий для всех пользователей: сессию входа в нем не храним и не обновляем
+    options = AsyncClientOptions(persist_session=False, auto_refresh_token=False)
+    supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    if SUPABASE_SERVICE_KEY:
+        admin_options = AsyncClientOptions(persist_session=False, auto_refresh_token=False)
+        supabase_admin = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY, options=admin_options)
+    start_emotion_service()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_emotion_service()
 
 class UserAuth(BaseModel):
     email: str
@@ -31,6 +59,7 @@ class UserAuth(BaseModel):
 
 class TokenReceiver(BaseModel):
     access_token: Optional[str] = None
+    state: Optional[str] = None
 
 class VerifyToken(BaseModel):
     access_token: str
@@ -42,15 +71,44 @@ class PasswordUpdate(BaseModel):
     access_token: str
     new_password: str
 
-google_auth_state = {
-    "status": "waiting",
-    "access_token": None
-}
+# Токены проверяем локально; к Supabase идем, только если локально решить нельзя
+jwt_verifier = LocalJWTVerifier(SUPABASE_URL, SUPABASE_KEY)
+VERIFY_SESSION_REMOTE_FALLBACK = os.getenv("VERIFY_SESSION_REMOTE_FALLBACK", "1") == "1"
+# Уже проверенные токены: повторные проверки с того же устройства не идут ни в JWT, ни в Supabase
+session_cache = SessionCache()
+
+session_cache_size = metrics.register(metrics.Gauge("session_cache_entries", "Validated sessions held in memory."))
+session_cache_events = metrics.register(metrics.Counter(
+    "session_cache_events_total", "Session cache hits, misses, evictions and invalidations.", ("event",)))
+
+def collect_session_cache():
+    stats = session_cache.stats()
+    session_cache_size.set(stats.pop("size"))
+    for event, value in stats.items():
+        session_cache_events.set(value, event)
+
+metrics.collectors.append(collect_session_cache)
+
+# Состояние каждой попытки входа через Google хранится отдельно по state ID
+auth_states = create_auth_state_store()
+# sign_in_with_oauth кладет PKCE code_verifier в общее хранилище клиента:
+# забираем его под замком, пока его не перезаписала параллельная попытка
+oauth_lock = asyncio.Lock()
+
+async def take_code_verifier(client):
+    storage = getattr(client.auth, "_storage", None)
+    if storage is None:
+        return None
+    key = f"{client.auth._storage_key}-code-verifier"
+    verifier = await storage.get_item(key)
+    if verifier:
+        await storage.remove_item(key)
+    return verifier
 
 @app.post("/register")
-def register_user(user: UserAuth):
+async def register_user(user: UserAuth):
     try:
-        response = supabase.auth.sign_up({"email": user.email, "password": user.password})
+        response = await upstream("sign_up", supabase.auth.sign_up({"email": user.email, "password": user.password}))
         # Supabase returns an identities array; if empty, user already exists
         if response.user and len(response.user.identities) == 0:
             raise HTTPException(status_code=400, detail="User already registered")
@@ -61,36 +119,48 @@ def register_user(user: UserAuth):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/login")
-def login_user(user: UserAuth):
+async def login_user(user: UserAuth):
     try:
-        response = supabase.auth.sign_in_with_password({"email": user.email, "password": user.password})
+        response = await upstream(
+            "sign_in_with_password",
+            supabase.auth.sign_in_with_password({"email": user.email, "password": user.password}),
+        )
         return {"message": "Успешный вход!", "access_token": response.session.access_token}
     except Exception as e:
         raise HTTPException(status_code=401, detail="Неверный email или пароль!")
 
 @app.get("/auth/google")
-def login_google():
-    global google_auth_state
-    google_auth_state = {"status": "waiting", "access_token": None} 
+async def login_google():
+    state = await auth_states.create({"status": "waiting", "access_token": None, "code_verifier": None})
     try:
-        res = supabase.auth.sign_in_with_oauth({
-            "provider": "google",
-            "options": {"redirect_to": "http://127.0.0.1:8000/callback"}
-        })
-        return {"url": res.url}
+        # Сетевых запросов здесь нет: клиент только собирает URL
+        async with oauth_lock:
+            res = await supabase.auth.sign_in_with_oauth({
+                "provider": "google",
+                "options": {"redirect_to": f"http://127.0.0.1:8000/callback?state={state}"}
+            })
+            code_verifier = await take_code_verifier(supabase)
+        await auth_states.update(state, code_verifier=code_verifier)
+        return {"url": res.url, "state": state}
     except Exception as e:
+        await auth_states.pop(state)
         raise HTTPException(status_code=400, detail=str(e))
 
 # УНИВЕРСАЛЬНЫЙ МОСТ (Ловит и code, и access_token)
 @app.get("/callback", response_class=HTMLResponse)
-def auth_callback(code: Optional[str] = None):
-    global google_auth_state
-    
+async def auth_callback(code: Optional[str] = None, state: Optional[str] = None):
+    attempt = await auth_states.get(state) if state else None
+    if attempt is None:
+        return "<html><body style='background:#121212; color:red; text-align:center; padding-top:20%; font-family:sans-serif;'><h1>Ссылка для входа устарела</h1><p>Попробуйте войти еще раз.</p></body></html>"
+
     # Если Гугл прислал код напрямую
     if code:
         try:
-            res = supabase.auth.exchange_code_for_session({"auth_code": code})
-            google_auth_state = {"status": "success", "access_token": res.session.access_token}
+            params = {"auth_code": code}
+            if attempt.get("code_verifier"):
+                params["code_verifier"] = attempt["code_verifier"]
+            res = await upstream("exchange_code_for_session", supabase.auth.exchange_code_for_session(params))
+            await auth_states.update(state, status="success", access_token=res.session.access_token)
             return "<html><body style='background:#121212; color:#4CAF50; text-align:center; padding-top:20%; font-family:sans-serif;'><h1>Вход выполнен успешно! 🎉</h1><p>Можете закрыть окно.</p></body></html>"
         except Exception as e:
             pass
@@ -104,12 +174,13 @@ def auth_callback(code: Optional[str] = None):
                 const hash = window.location.hash.substring(1);
                 const params = new URLSearchParams(hash);
                 const token = params.get('access_token');
+                const state = new URLSearchParams(window.location.search).get('state');
                 
                 if (token) {
                     fetch('http://127.0.0.1:8000/google-success', {
                         method: 'POST',
                         headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({access_token: token})
+                        body: JSON.stringify({access_token: token, state: state})
                     }).then(() => {
                         document.getElementById("msg").innerHTML = "<span style='color:#4CAF50;'>Вход выполнен успешно! 🎉</span><br><br>Можете закрыть это окно.";
                     });
@@ -122,39 +193,87 @@ def auth_callback(code: Optional[str] = None):
     """
 
 @app.post("/google-success")
-def google_success(data: TokenReceiver):
-    global google_auth_state
-    if data.access_token:
-        google_auth_state = {"status": "success", "access_token": data.access_token}
+async def google_success(data: TokenReceiver):
+    if data.access_token and data.state:
+        await auth_states.update(data.state, status="success", access_token=data.access_token)
     return {"status": "ok"}
 
+# Дольше держать запрос открытым не стоит: прокси и клиенты обрывают его по таймауту
+CHECK_GOOGLE_MAX_WAIT = 30
+
 @app.get("/check-google")
-def check_google():
-    global google_auth_state
-    if google_auth_state["status"] == "success":
-        res = dict(google_auth_state)
-        google_auth_state = {"status": "waiting", "access_token": None}
-        return res
+async def check_google(state: str, wait: float = 0):
+    # wait > 0: long-poll, ответ приходит сразу после /callback или /google-success
+    attempt = await auth_states.wait_result(state, min(max(wait, 0), CHECK_GOOGLE_MAX_WAIT))
+    if attempt is None:
+        return {"status": "expired"}
+    if attempt["status"] == "success":
+        return {"status": "success", "access_token": attempt["access_token"]}
     return {"status": "waiting"}
 
+async def authenticate(token):
+    """-> {"id", "email"} владельца токена.
+
+    TokenInvalid - токен отклонен; HTTPException 503 - проверить сейчас нельзя.
+    """
+    user = session_cache.get(token)
+    if user is not None:
+        return user
+    try:
+        claims = await jwt_verifier.verify(token)
+        user = {"id": claims["sub"], "email": claims.get("email")}
+    except VerifierUnavailable as e:
+        if not VERIFY_SESSION_REMOTE_FALLBACK:
+            raise HTTPException(status_code=503, detail=f"Cannot verify session: {e}")
+        # Запасной путь: спрашиваем сам Supabase
+        claims = token_claims(token)
+        try:
+            response = await upstream("get_user", supabase.auth.get_user(token))
+        except Exception as e:
+            # 401/403 - токен отклонен; сбой или таймаут Supabase - не повод разлогинивать
+            if getattr(e, "status", None) in (401, 403):
+                raise TokenInvalid(str(e))
+            raise HTTPException(status_code=503, detail="Auth service unavailable")
+        if not (response and response.user):
+            raise TokenInvalid("User not found")
+        user = {"id": response.user.id, "email": response.user.email}
+    if session_cache.is_revoked(token, claims):
+        raise TokenInvalid("Session revoked")
+    session_cache.put(token, user["id"], user, exp=claims.get("exp"))
+    return user
+
 @app.post("/verify-session")
-def verify_session(data: VerifyToken):
+async def verify_session(data: VerifyToken):
     try:
-        response = supabase.auth.get_user(data.access_token)
-        if response.user:
-            return {"valid": True}
-        return {"valid": False}
-    except Exception as e:
+        await authenticate(data.access_token)
+        return {"valid": True}
+    except TokenInvalid as e:
         return {"valid": False, "error": str(e)}
 
+@app.post("/logout")
+async def logout(data: VerifyToken):
+    try:
+        await authenticate(data.access_token)
+    except TokenInvalid:
+        # Недействительный токен отзывать незачем; так в список отзывов не попадает мусор
+        return {"message": "Logged out."}
+    # Токен только что проверен: его exp можно брать из тела
+    session_cache.invalidate(data.access_token, exp=token_claims(data.access_token).get("exp"))
+    if supabase_admin:
+        try:
+            await upstream("sign_out", supabase_admin.auth.admin.sign_out(data.access_token))
+        except Exception:
+            pass
+    return {"message": "Logged out."}
+
 
 @app.post("/forgot-password")
-def forgot_password(data: PasswordResetRequest):
+async def forgot_password(data: PasswordResetRequest):
     try:
-        supabase.auth.reset_password_email(
+        await upstream("reset_password_email", supabase.auth.reset_password_email(
             data.email,
             options={"redirect_to": "http://127.0.0.1:8000/reset-password"}
-        )
+        ))
         return {"message": "Password reset email sent."}
     except Exception as e:
         # Always return success to avoid email enumeration
@@ -237,14 +356,18 @@ def reset_password_page(access_token: Optional[str] = None, token_hash: Optional
 
 
 @app.post("/update-password")
-def update_password(data: PasswordUpdate):
+async def update_password(data: PasswordUpdate):
     try:
-        user = supabase.auth.get_user(data.access_token)
-        supabase_admin.auth.admin.update_user_by_id(
-            user.user.id,
+        user = await authenticate(data.access_token)
+        await upstream("update_user_by_id", supabase_admin.auth.admin.update_user_by_id(
+            user["id"],
             {"password": data.new_password}
-        )
+        ))
+        # Старые сессии после смены пароля больше не принимаем
+        session_cache.invalidate_user(user["id"])
         return {"message": "Password updated successfully."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -0,0 +1,167 @@
+import bisect
+import threading
+import time
+
+import anyio
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+# Границы корзин гистограмм, секунд: от быстрых локальных проверок до таймаута Supabase
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        # Для счетчиков, которые ведутся в другом месте (например, в SessionCache)
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Гистограмма Prometheus; observe() - бинпоиск корзины и три сложения под замком."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled right now.")
+upstream_latency = Histogram("supabase_call_duration_seconds", "Supabase call latency by call.", ("call",))
+upstream_errors = Counter("supabase_call_errors_total", "Failed Supabase calls by call and kind.", ("call", "kind"))
+threadpool_busy = Gauge("threadpool_busy_threads", "Worker threads busy with sync routes and to_thread work.")
+threadpool_size = Gauge("threadpool_max_threads", "Size of the anyio worker thread pool.")
+
+METRICS = [http_requests, http_latency, http_in_flight, upstream_latency, upstream_errors, threadpool_busy, threadpool_size]
+# Функции, которые при каждом чтении /metrics обновляют свои Gauge (например, статистику кешей)
+collectors = []
+
+
+def register(metric):
+    METRICS.append(metric)
+    return metric
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: число запросов, статусы и время ответа по шаблону маршрута.
+
+    Маршрут берется как шаблон ("/assets/{digest}"), а не как путь, чтобы
+    число рядов не росло от параметров; запросы мимо всех маршрутов
+    попадают в route="unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _track(self, delta):
+        with self._lock:
+            self._in_flight += delta
+            http_in_flight.set(self._in_flight)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        self._track(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._track(-1)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_latency.observe(time.perf_counter() - start, scope["method"], path)
+            http_requests.inc(scope["method"], path, str(status))
+
+
+def render():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    threadpool_busy.set(limiter.borrowed_tokens)
+    threadpool_size.set(limiter.total_tokens)
+    for collect in collectors:
+        collect()
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Сколько проверенных сессий держим в памяти процесса
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# Сколько секунд доверяем результату проверки (не дольше exp самого токена)
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "300"))
+# Дольше этого access token Supabase не живет: отзывы старше можно забыть
+MAX_TOKEN_LIFETIME = int(os.getenv("MAX_TOKEN_LIFETIME", "86400"))
+# Сколько отозванных токенов помним; при переполнении первыми забываются те, что скорее истекут
+REVOKED_TOKENS_SIZE = int(os.getenv("REVOKED_TOKENS_SIZE", "100000"))
+
+
+def token_key(token):
+    # Сам токен в памяти не храним - только его хеш
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_claims(token):
+    """Claims из тела JWT без проверки подписи; {} для мусора.
+
+    Годится только для токенов, которые уже проверены (локально или Supabase).
+    """
+    try:
+        body = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except (IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+class SessionCache:
+    """LRU-кеш проверенных access token'ов с TTL, ограниченным exp токена.
+
+    Запись - (истекает, user_id, user). Помимо кеша ведет список отзывов:
+    токен после /logout и все токены пользователя, выпущенные до смены
+    пароля, больше не считаются действительными, даже если подпись верна.
+    """
+
+    def __init__(self, max_entries=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL, max_revoked=REVOKED_TOKENS_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_revoked = max_revoked
+        self._items = OrderedDict()
+        self._revoked_tokens = {}
+        # (exp, key) по возрастанию exp: истекшие отзывы снимаются с вершины, без обхода всех
+        self._revoked_heap = []
+        # Порядок вставки = порядок времени отзыва: старые - в начале
+        self._revoked_users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token):
+        """-> user для ранее проверенного токена или None."""
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def put(self, token, user_id, user, exp=None):
+        expires = time.time() + self.ttl
+        if exp is not None:
+            expires = min(expires, exp)
+        key = token_key(token)
+        with self._lock:
+            self._items[key] = (expires, user_id, user)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def is_revoked(self, token, claims):
+        now = time.time()
+        with self._lock:
+            if self._revoked_tokens.get(token_key(token), 0) > now:
+                return True
+            revoked_at = self._revoked_users.get(claims.get("sub"))
+            # iat - целые секунды: токен, выданный в ту же секунду, что и отзыв, не трогаем
+            return revoked_at is not None and claims.get("iat", 0) < int(revoked_at)
+
+    def invalidate(self, token, exp=None):
+        """Выход: забываем токен и не принимаем его до истечения.
+
+        Только для проверенных токенов: exp - из их проверенных claims.
+        """
+        key = token_key(token)
+        # Дольше MAX_TOKEN_LIFETIME отзыв держать незачем, какой бы exp ни был в токене
+        limit = time.time() + MAX_TOKEN_LIFETIME
+        exp = min(exp, limit) if exp is not None else limit
+        with self._lock:
+            self._items.pop(key, None)
+            self._revoked_tokens[key] = exp
+            heapq.heappush(self._revoked_heap, (exp, key))
+            self.invalidations += 1
+            self._sweep_revoked()
+
+    def invalidate_user(self, user_id):
+        """Смена пароля: отзываем все уже выданные токены пользователя."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, item in self._items.items() if item[1] == user_id]:
+                del self._items[key]
+                self.invalidations += 1
+            self._revoked_users[user_id] = now
+            self._revoked_users.move_to_end(user_id)
+            self._sweep_revoked()
+
+    def _sweep_revoked(self):
+        now = time.time()
+        heap = self._revoked_heap
+        while heap and (heap[0][0] <= now or len(self._revoked_tokens) > self.max_revoked):
+            exp, key = heapq.heappop(heap)
+            # Токен могли отозвать повторно с другим exp: тогда эта запись устарела
+            if self._revoked_tokens.get(key) == exp:
+                del self._revoked_tokens[key]
+        while self._revoked_users:
+            user_id, at = next(iter(self._revoked_users.items()))
+            if at + MAX_TOKEN_LIFETIME > now:
+                break
+            del self._revoked_users[user_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
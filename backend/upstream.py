@@ -0,0 +1,37 @@
+import asyncio
+import os
+import time
+
+from metrics import upstream_errors, upstream_latency
+
+# Сколько ждем ответа Supabase, секунд
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+# Сколько запросов к Supabase может идти одновременно со всего процесса
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "64"))
+
+_semaphore = None
+
+
+async def upstream(name, awaitable, timeout=SUPABASE_TIMEOUT):
+    """Выполняет вызов Supabase с общим лимитом параллельности и таймаутом.
+
+    name - короткое имя вызова (например, "get_user"): метка в метриках
+    supabase_call_duration_seconds и supabase_call_errors_total.
+    При превышении таймаута бросает asyncio.TimeoutError.
+    """
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(SUPABASE_MAX_CONCURRENCY)
+    async with _semaphore:
+        # Время считаем после семафора: ожидание своей очереди - не задержка Supabase
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            upstream_errors.inc(name, "timeout")
+            raise
+        except Exception:
+            upstream_errors.inc(name, "error")
+            raise
+        finally:
+            upstream_latency.observe(time.perf_counter() - start, name)
@@ -0,0 +1,55 @@
+"""Сравнение покадровой классификации: по одному predict на лицо vs один батч на кадр.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_batching --weights emotionsbest.pt --faces 1 4 8
+"""
+import argparse
+
+import cv2
+from ultralytics import YOLO
+
+from benchmarks.common import grid_faces, summarize, synthetic_frame, timed
+from emotion.batching import BatchedEmotionClassifier
+from emotion.faces import expand_box
+
+
+def per_face(model, frame, faces, conf, imgsz):
+    # Старый путь из MLtest.py: отдельный predict на каждое лицо
+    for face in faces:
+        x1, y1, x2, y2 = expand_box(face, frame.shape)
+        face_gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        face_gray_3c = cv2.cvtColor(face_gray, cv2.COLOR_GRAY2BGR)
+        model.predict(source=face_gray_3c, conf=conf, imgsz=imgsz, device='cpu', verbose=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default="emotionsbest.pt")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.45)
+    args = parser.parse_args()
+
+    model = YOLO(args.weights)
+    classifier = BatchedEmotionClassifier(model, imgsz=args.imgsz, conf=args.conf, device='cpu')
+    frame = synthetic_frame()
+
+    print(f"{'faces':>5} {'mode':>9} {'fps':>8} {'mean ms':>9} {'p95 ms':>9}")
+    for count in args.faces:
+        faces = grid_faces(count, frame.shape)
+        modes = {
+            "per-face": lambda: per_face(model, frame, faces, args.conf, args.imgsz),
+            "batched": lambda: classifier.classify(frame, faces),
+        }
+        for name, run in modes.items():
+            for _ in range(args.warmup):
+                run()
+            latencies = [timed(run)[1] for _ in range(args.frames)]
+            stats = summarize(latencies)
+            print(f"{count:>5} {name:>9} {stats['fps']:>8.2f} {stats['mean_ms']:>9.1f} {stats['p95_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Микро-бенчмарк подготовки лиц: время на лицо и выделения памяти на кадр.
+
+legacy - прежний путь: вырезка BGR, BGR->GRAY, GRAY->BGR, letterbox в
+новый массив, np.stack и float-тензор на каждый кадр. buffered -
+FacePreprocessor: вырезки-view из ЧБ кадра, масштабирование сразу в
+переиспользуемый буфер, каналы через expand.
+
+Выделения считаются через tracemalloc (numpy и OpenCV выделяют через
+него видимую память; внутренние выделения torch не видны).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_preprocess --faces 1 4 8 --imgsz 320
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+
+from benchmarks.common import grid_faces, synthetic_frame
+from emotion.faces import expand_box
+from emotion.preprocess import LETTERBOX_COLOR, FacePreprocessor
+
+
+def legacy_batch(frame, faces, imgsz):
+    crops = []
+    for face in faces:
+        x1, y1, x2, y2 = expand_box(face, frame.shape)
+        face_gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        crop = cv2.cvtColor(face_gray, cv2.COLOR_GRAY2BGR)
+        h, w = crop.shape[:2]
+        scale = imgsz / max(h, w)
+        new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+        out = np.full((imgsz, imgsz, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+        out[top:top + new_h, left:left + new_w] = cv2.resize(crop, (new_w, new_h))
+        crops.append(out)
+    return torch.from_numpy(np.stack(crops)).permute(0, 3, 1, 2).float().div_(255.0).contiguous()
+
+
+def buffered_batch(preprocessor, gray, faces):
+    crops = []
+    for face in faces:
+        x1, y1, x2, y2 = expand_box(face, gray.shape)
+        crops.append(gray[y1:y2, x1:x2])
+    return preprocessor.load(crops)
+
+
+def measure(run, frames):
+    run()  # прогрев
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for _ in range(frames):
+        run()
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return elapsed, peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, default=320)
+    args = parser.parse_args()
+
+    frame = synthetic_frame()
+    preprocessor = FacePreprocessor(args.imgsz, max_batch=max(args.faces))
+
+    print(f"{'faces':>5} {'mode':>9} {'us/face':>9} {'peak KiB/frame':>15} {'live blocks':>12}")
+    for count in args.faces:
+        faces = grid_faces(count, frame.shape)
+        modes = {
+            "legacy": lambda: legacy_batch(frame, faces, args.imgsz),
+            # ЧБ кадр считается один раз на кадр (он уже нужен для Haar)
+            "buffered": lambda: buffered_batch(preprocessor, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), faces),
+        }
+        for name, run in modes.items():
+            elapsed, peak, blocks = measure(run, args.frames)
+            per_face_us = elapsed / (args.frames * count) * 1e6
+            print(f"{count:>5} {name:>9} {per_face_us:>9.1f} {peak / 1024:>15.1f} {blocks:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Воспроизводимый бенчмарк пути детекции/классификации эмоций без камеры.
+
+Прогоняет фиксированный набор кадров через Haar, вырезку лиц и YOLO:
+  * clip - кадры записанного ролика (--clip);
+  * synthetic_WxH - синтетические кадры с 0..10 лицами для нескольких
+    разрешений. Лица берутся из --faces-dir или вырезаются из ролика и
+    вклеиваются в шумовой фон с фиксированным seed.
+
+Для каждого режима (plain - каскад и модель на каждом кадре, tracked -
+трекер и сглаживание как в MLtest.py) пишет p50/p95/p99 по стадиям,
+fps, RSS до режима и пиковый RSS за время режима (на Linux пик
+сбрасывается перед каждым режимом через /proc/self/clear_refs; где так
+нельзя, peak_rss_scope = "process" и пик общий на весь процесс) и число
+вызовов модели на кадр в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_suite --clip session.mp4 --out bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.common import summarize
+from emotion.faces import detect_faces, load_face_cascade
+from emotion.runtime import RUNTIME_BACKENDS, create_classifier, runtime_config
+from emotion.smoothing import EmotionSmoother
+from emotion.tracker import FaceTracker
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+FACE_COUNTS = list(range(0, 11))
+
+
+class Timed:
+    """Обертка, считающая вызовы и время функции."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+        self.latencies = []
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.fn(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        self.calls += 1
+        return result
+
+    def reset(self):
+        self.calls = 0
+        self.latencies = []
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def proc_status_mb(field):
+    """VmRSS / VmHWM из /proc/self/status в мегабайтах; None не на Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Сбрасывает пиковый RSS (VmHWM) процесса к текущему; False, если ядро так не умеет."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return proc_status_mb("VmHWM") is not None
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_clip(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def load_face_patches(faces_dir, clip_frames, face_cascade, limit=32):
+    patches = []
+    if faces_dir:
+        for path in sorted(Path(faces_dir).rglob("*")):
+            image = cv2.imread(str(path))
+            if image is not None:
+                patches.append(image)
+    for frame in clip_frames:
+        if len(patches) >= limit:
+            break
+        for x, y, w, h in detect_faces(face_cascade, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)):
+            pad = int(h * 0.2)
+            patches.append(frame[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad].copy())
+    return patches[:limit]
+
+
+def synthetic_frames(width, height, patches, repeat, seed):
+    rng = np.random.default_rng(seed)
+    frames = []
+    cell = min(width // 5, height // 3)
+    cells = [(col * cell, row * cell) for row in range(height // cell) for col in range(width // cell)]
+    for count in FACE_COUNTS:
+        if count and not patches:
+            continue
+        for _ in range(repeat):
+            noise = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+            frame = cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR)
+            for index in rng.choice(len(cells), size=count, replace=False):
+                x, y = cells[index]
+                patch = patches[rng.integers(len(patches))]
+                size = int(cell * rng.uniform(0.6, 0.95))
+                ph, pw = patch.shape[:2]
+                scale = size / max(ph, pw)
+                resized = cv2.resize(patch, (max(1, int(pw * scale)), max(1, int(ph * scale))))
+                frame[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+            frames.append(frame)
+    return frames
+
+
+def run_mode(mode, frames, face_cascade, classifier, args):
+    predict = classifier.model.predict = Timed(classifier.model.predict)
+    load = classifier.preprocessor.load = Timed(classifier.preprocessor.load)
+    tracker = FaceTracker(face_cascade, detect_every=1 if mode == "plain" else args.detect_every)
+    smoother = EmotionSmoother(classifier.names, reclassify_every=args.reclassify_every) if mode == "tracked" else None
+
+    rss_before = proc_status_mb("VmRSS")
+    # ru_maxrss растет за весь процесс (в нем уже все наборы кадров): пик режима меряем отдельно
+    peak_scoped = reset_peak_rss()
+
+    detect_times, crop_times, frame_times = [], [], []
+    start_all = time.perf_counter()
+    for frame in frames:
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks = tracker.update(gray)
+        detected = time.perf_counter()
+        crops = classifier.crop_faces(gray, [track.box for track in tracks])
+        crop_times.append(time.perf_counter() - detected)
+        detect_times.append(detected - start)
+        if smoother is None:
+            classifier.classify_crops([crop for _, _, crop in crops])
+        else:
+            smoother.step([(tracks[i].id, crop) for i, _, crop in crops], classifier.classify_crops)
+        frame_times.append(time.perf_counter() - start)
+    wall = time.perf_counter() - start_all
+    peak = proc_status_mb("VmHWM") if peak_scoped else peak_rss_mb()
+
+    # classify - только вызовы модели, препроцессинг батча меряется отдельно
+    report = {
+        "frames": len(frames),
+        "fps": len(frames) / wall if wall else 0.0,
+        "model_calls": predict.calls,
+        "model_calls_per_frame": predict.calls / len(frames) if frames else 0.0,
+        "stages": {
+            "detect": summarize(detect_times),
+            "crop": summarize(crop_times),
+            "preprocess": summarize(load.latencies),
+            "classify": summarize(predict.latencies),
+            "frame": summarize(frame_times),
+        },
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak,
+        "peak_rss_delta_mb": peak - rss_before if peak_scoped and rss_before is not None else None,
+        "peak_rss_scope": "mode" if peak_scoped else "process",
+    }
+    # Возвращаем исходные методы, чтобы следующий режим мерился с нуля
+    classifier.model.predict = predict.fn
+    classifier.preprocessor.load = load.fn
+    return report
+
+
+def main():
+    config = runtime_config()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clip", default=None, help="записанный ролик")
+    parser.add_argument("--clip-frames", type=int, default=300)
+    parser.add_argument("--faces-dir", default=None, help="папка с лицами для синтетических кадров")
+    parser.add_argument("--resolutions", nargs="+", default=[f"{w}x{h}" for w, h in RESOLUTIONS])
+    parser.add_argument("--repeat", type=int, default=5, help="кадров на каждое число лиц")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", choices=["plain", "tracked"], default=["plain", "tracked"])
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--reclassify-every", type=int, default=10)
+    parser.add_argument("--weights", default="emotionsbest.pt")
+    parser.add_argument("--backend", choices=RUNTIME_BACKENDS, default=config["backend"])
+    parser.add_argument("--imgsz", type=int, default=config["imgsz"])
+    parser.add_argument("--int8", action="store_true", default=config["int8"])
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    face_cascade = load_face_cascade()
+    classifier = create_classifier(args.weights, args.backend, args.imgsz, args.int8, config["int8_data"])
+
+    datasets = {}
+    clip_frames = read_clip(args.clip, args.clip_frames) if args.clip else []
+    if clip_frames:
+        datasets["clip"] = clip_frames
+    patches = load_face_patches(args.faces_dir, clip_frames, face_cascade)
+    if not patches:
+        print("⚠️ Нет лиц для синтетики (--faces-dir или --clip): синтетические кадры будут без лиц")
+    for resolution in args.resolutions:
+        width, height = map(int, resolution.split("x"))
+        datasets[f"synthetic_{resolution}"] = synthetic_frames(width, height, patches, args.repeat, args.seed)
+
+    # Прогрев модели, чтобы первый вызов не попал в статистику
+    warmup = np.full((160, 160), 128, dtype=np.uint8)
+    classifier.classify_crops([warmup])
+
+    results = {}
+    for name, frames in datasets.items():
+        results[name] = {}
+        for mode in args.modes:
+            report = run_mode(mode, frames, face_cascade, classifier, args)
+            results[name][mode] = report
+            stages = report["stages"]
+            print(f"{name:>20} {mode:>8} {report['fps']:>7.1f} fps  "
+                  f"detect p95 {stages['detect']['p95_ms']:.1f} ms  "
+                  f"classify p95 {stages['classify']['p95_ms']:.1f} ms  "
+                  f"{report['model_calls_per_frame']:.2f} calls/frame  "
+                  f"peak RSS {report['peak_rss_mb']:.0f} MB")
+
+    output = {
+        "meta": {
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "args": vars(args),
+            "patches": len(patches),
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    Path(args.out).write_text(json.dumps(output, indent=2))
+    print(f"Результаты записаны в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Haar на каждом кадре vs detect-then-track: fps детекции и доля пропущенных лиц.
+
+Пропуском считается лицо, найденное каскадом на кадре, с которым ни одна
+рамка трекера не пересекается хотя бы на --match-iou.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_tracker --video session.mp4 --detect-every 1 3 5 10
+"""
+import argparse
+
+import cv2
+
+from benchmarks.common import summarize, timed
+from emotion.faces import detect_faces, load_face_cascade
+from emotion.tracker import FaceTracker, iou
+
+
+def read_gray_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--detect-every", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--search-padding", type=float, default=0.5)
+    parser.add_argument("--match-iou", type=float, default=0.3)
+    args = parser.parse_args()
+
+    frames = read_gray_frames(args.video, args.frames)
+    if not frames:
+        raise SystemExit(f"Не удалось прочитать кадры из {args.video}")
+    face_cascade = load_face_cascade()
+
+    baseline, latencies = [], []
+    for gray in frames:
+        faces, latency = timed(detect_faces, face_cascade, gray)
+        baseline.append([tuple(int(v) for v in face) for face in faces])
+        latencies.append(latency)
+    stats = summarize(latencies)
+    total_faces = sum(len(faces) for faces in baseline)
+    print(f"{len(frames)} кадров, {total_faces} лиц по каскаду")
+    print(f"{'mode':>14} {'fps':>9} {'mean ms':>9} {'cascades':>9} {'miss rate':>10}")
+    print(f"{'cascade':>14} {stats['fps']:>9.1f} {stats['mean_ms']:>9.2f} {len(frames):>9} {0.0:>10.3f}")
+
+    for every in args.detect_every:
+        tracker = FaceTracker(face_cascade, detect_every=every, search_padding=args.search_padding)
+        latencies, missed = [], 0
+        for gray, expected in zip(frames, baseline):
+            tracks, latency = timed(tracker.update, gray)
+            latencies.append(latency)
+            for face in expected:
+                if not any(iou(face, track.box) >= args.match_iou for track in tracks):
+                    missed += 1
+        stats = summarize(latencies)
+        miss_rate = missed / total_faces if total_faces else 0.0
+        print(f"{'track/' + str(every):>14} {stats['fps']:>9.1f} {stats['mean_ms']:>9.2f} "
+              f"{tracker.detections:>9} {miss_rate:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
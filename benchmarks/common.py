@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def summarize(latencies):
+    """Список задержек в секундах -> сводка в миллисекундах + fps."""
+    ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    total = float(ms.sum()) / 1000.0
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()) if len(ms) else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "fps": len(ms) / total if total > 0 else 0.0,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_frame(width=1280, height=720, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+def grid_faces(count, frame_shape, size=160):
+    """Раскладывает count рамок (x, y, w, h) сеткой по кадру."""
+    height, width = frame_shape[:2]
+    cols = max(1, width // size)
+    faces = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        faces.append((col * size, (row * size) % max(1, height - size), size - 10, size - 10))
+    return faces
@@ -0,0 +1,100 @@
+"""Точность и задержка рантаймов модели эмоций на папке размеченных лиц.
+
+Папка вида faces/<эмоция>/*.jpg: имя подпапки - правильный класс
+(сравнивается с model.names без учета регистра). Для каждого рантайма
+считается точность, совпадение ответов с первым рантаймом в списке и
+задержка на батч/лицо. Если вместо запрошенного рантайма загрузился
+другой (например, экспорт не удался и модель откатилась на PyTorch),
+строка помечается ошибкой, а не выдается за запрошенный рантайм.
+
+Запуск из корня репозитория:
+    python -m benchmarks.compare_runtimes --data faces/ --backends torch onnx onnx+int8 openvino
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.common import summarize
+from emotion.runtime import create_classifier
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_dataset(root):
+    samples = []
+    for path in sorted(Path(root).rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            continue
+        samples.append((path.parent.name.lower(), image))
+    return samples
+
+
+class RuntimeMismatch(Exception):
+    pass
+
+
+def run_backend(spec, args, samples):
+    backend, _, option = spec.partition("+")
+    classifier = create_classifier(args.weights, backend, args.imgsz, int8=option == "int8", int8_data=args.int8_data)
+    if classifier.runtime != spec:
+        raise RuntimeMismatch(classifier.runtime)
+    crops = [crop for _, crop in samples]
+    classifier.classify_crops(crops[:args.batch])  # прогрев
+    predictions, latencies = [], []
+    for start in range(0, len(crops), args.batch):
+        batch = crops[start:start + args.batch]
+        t0 = time.perf_counter()
+        results = classifier.classify_crops(batch)
+        latencies.append((time.perf_counter() - t0) / len(batch))
+        predictions.extend(result.name.lower() if result is not None else None for result in results)
+    return predictions, summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", required=True, help="папка faces/<эмоция>/*.jpg")
+    parser.add_argument("--weights", default="emotionsbest.pt")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx+int8", "openvino"])
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--int8-data", default=None, help="датасет калибровки для OpenVINO INT8")
+    parser.add_argument("--json", default=None, help="куда сохранить отчет")
+    args = parser.parse_args()
+
+    samples = load_dataset(args.data)
+    if not samples:
+        raise SystemExit(f"В {args.data} нет изображений")
+    labels = [label for label, _ in samples]
+
+    report, reference, failed = {}, None, 0
+    print(f"{len(samples)} лиц")
+    print(f"{'backend':>14} {'ran':>14} {'accuracy':>9} {'agree':>7} {'ms/face':>8} {'p95':>8} {'faces/s':>8}")
+    for spec in args.backends:
+        try:
+            predictions, stats = run_backend(spec, args, samples)
+        except RuntimeMismatch as e:
+            failed += 1
+            report[spec] = {"runtime": str(e), "error": f"requested {spec}, but {e} was loaded"}
+            print(f"{spec:>14} {str(e):>14}  ❌ запрошен {spec}, загрузился {e}: строка не засчитана")
+            continue
+        reference = reference or predictions
+        accuracy = sum(p == label for p, label in zip(predictions, labels)) / len(labels)
+        agreement = sum(p == r for p, r in zip(predictions, reference)) / len(labels)
+        report[spec] = {"runtime": spec, "accuracy": accuracy, "agreement": agreement, "latency_per_face": stats}
+        print(f"{spec:>14} {spec:>14} {accuracy:>9.3f} {agreement:>7.3f} {stats['mean_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {1000.0 / stats['mean_ms'] if stats['mean_ms'] else 0:>8.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if failed:
+        raise SystemExit(f"Не тот рантайм в {failed} строках")
+
+
+if __name__ == "__main__":
+    main()
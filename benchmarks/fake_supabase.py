@@ -0,0 +1,202 @@
+"""Локальный стенд Supabase Auth (GoTrue) для нагрузочных тестов бэкенда.
+
+Отвечает на те же эндпоинты, что использует backend/main.py
+(регистрация, вход по паролю, обмен OAuth-кода, get_user, JWKS, выход и
+админское обновление пользователя), с настраиваемой задержкой и долей
+ответов 503. Токены - настоящие HS256 JWT, подписанные --jwt-secret.
+
+Запуск из корня репозитория:
+    python -m benchmarks.fake_supabase --port 9999 --latency-ms 100 --error-rate 0.01
+и бэкенд, направленный на него (секрет нужен для локальной проверки JWT):
+    cd backend && SUPABASE_URL=http://127.0.0.1:9999 \
+        SUPABASE_JWT_SECRET=fake-supabase-jwt-secret SUPABASE_SERVICE_KEY=fake uvicorn main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, Response
+
+FAKE_JWT_SECRET = "fake-supabase-jwt-secret"
+TOKEN_TTL = 3600
+
+app = FastAPI()
+config = {
+    "latency": 0.0,
+    "jitter": 0.0,
+    "error_rate": 0.0,
+    "jwt_secret": FAKE_JWT_SECRET,
+    "issuer": "http://127.0.0.1:9999/auth/v1",
+}
+users = {}
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_jwt(payload, secret):
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    body = _b64(json.dumps(payload).encode())
+    signature = hmac.new(secret.encode(), f"{header}.{body}".encode(), hashlib.sha256).digest()
+    return f"{header}.{body}.{_b64(signature)}"
+
+
+def read_jwt(token, secret):
+    try:
+        header, body, signature = token.split(".")
+        expected = _b64(hmac.new(secret.encode(), f"{header}.{body}".encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        payload = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+    return payload if payload.get("exp", 0) > time.time() else None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_or_create_user(email):
+    user = users.get(email)
+    if user is None:
+        user_id = str(uuid.uuid4())
+        user = {
+            "id": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": {},
+            "identities": [{
+                "id": user_id,
+                "identity_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "identity_data": {"email": email, "sub": user_id},
+                "provider": "email",
+                "created_at": _now(),
+                "last_sign_in_at": _now(),
+                "updated_at": _now(),
+            }],
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        users[email] = user
+    return user
+
+
+def session_for(user):
+    now = int(time.time())
+    access_token = make_jwt({
+        "sub": user["id"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": user["email"],
+        "iss": config["issuer"],
+        "iat": now,
+        "exp": now + TOKEN_TTL,
+    }, config["jwt_secret"])
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": TOKEN_TTL,
+        "expires_at": now + TOKEN_TTL,
+        "refresh_token": uuid.uuid4().hex,
+        "user": user,
+    }
+
+
+def error(status, message):
+    return JSONResponse({"code": status, "error_code": "fake_error", "msg": message}, status_code=status)
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    delay = config["latency"] + random.uniform(0, config["jitter"])
+    if delay:
+        await asyncio.sleep(delay)
+    if config["error_rate"] and random.random() < config["error_rate"]:
+        return error(503, "Injected upstream failure")
+    return await call_next(request)
+
+
+@app.post("/auth/v1/signup")
+async def signup(request: Request):
+    data = await request.json()
+    return get_or_create_user(data["email"])
+
+
+@app.post("/auth/v1/token")
+async def token(request: Request, grant_type: str):
+    data = await request.json()
+    if grant_type == "password":
+        if data.get("password") == "wrong":
+            return error(400, "Invalid login credentials")
+        return session_for(get_or_create_user(data["email"]))
+    if grant_type == "pkce":
+        return session_for(get_or_create_user(f"google-{data.get('auth_code')}@example.com"))
+    return error(400, f"Unsupported grant_type {grant_type}")
+
+
+@app.get("/auth/v1/user")
+async def get_user(authorization: str = Header("")):
+    payload = read_jwt(authorization.removeprefix("Bearer "), config["jwt_secret"])
+    if payload is None:
+        return error(401, "invalid JWT")
+    return get_or_create_user(payload["email"])
+
+
+@app.get("/auth/v1/.well-known/jwks.json")
+async def jwks():
+    # Токены стенда подписаны общим секретом: асимметричных ключей нет
+    return {"keys": []}
+
+
+@app.post("/auth/v1/logout")
+async def logout():
+    return Response(status_code=204)
+
+
+@app.post("/auth/v1/recover")
+async def recover():
+    return {}
+
+
+@app.put("/auth/v1/admin/users/{user_id}")
+async def admin_update_user(user_id: str):
+    for user in users.values():
+        if user["id"] == user_id:
+            return user
+    return error(404, "User not found")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="задержка каждого ответа")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="случайная добавка к задержке, 0..jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503, 0..1")
+    parser.add_argument("--jwt-secret", default=FAKE_JWT_SECRET)
+    args = parser.parse_args()
+    config["latency"] = args.latency_ms / 1000.0
+    config["jitter"] = args.jitter_ms / 1000.0
+    config["error_rate"] = args.error_rate
+    config["jwt_secret"] = args.jwt_secret
+    config["issuer"] = f"http://{args.host}:{args.port}/auth/v1"
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
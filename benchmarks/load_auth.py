@@ -0,0 +1,167 @@
+"""Нагрузочный тест auth-эндпоинтов бэкенда: запросы в секунду и p50/p95/p99 по эндпоинтам.
+
+Бэкенд должен смотреть на локальный стенд (benchmarks/fake_supabase.py),
+а не на настоящий Supabase. Чтобы сравнить "до" и "после", тот же
+сценарий прогоняется против текущего бэкенда и против синхронного,
+поднятого benchmarks/sync_baseline.py: старые коммиты с зашитым адресом
+Supabase напрямую не запускать - они пойдут в настоящий проект.
+
+Сценарии:
+    verify - шквал /verify-session при старте приложения у --tokens устройств;
+    login  - волна входов по паролю новыми пользователями;
+    google - вход через Google целиком: /auth/google -> /callback (вместо
+             браузера) -> /check-google;
+    mixed  - все вместе в пропорции --mix.
+
+Запуск из корня репозитория:
+    python -m benchmarks.load_auth --scenario mixed --mix verify=70 login=20 google=10 --concurrency 100
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import summarize
+
+SCENARIOS = ("verify", "login", "google")
+PASSWORD = "load-test-password"
+# Подготовительные входы повторяются: --error-rate стенда бьет и по ним
+SETUP_ATTEMPTS = 5
+
+
+class Recorder:
+    """Задержки и ошибки по эндпоинтам."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, endpoint, request, ok=lambda res: res.status_code == 200):
+        """-> ответ или None, если запрос не удался."""
+        start = time.perf_counter()
+        try:
+            res = await request
+        except httpx.HTTPError:
+            res = None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if res is None or not ok(res):
+            self.errors[endpoint] += 1
+            return None
+        return res
+
+
+async def login(client, email):
+    for attempt in range(SETUP_ATTEMPTS):
+        res = await client.post("/login", json={"email": email, "password": PASSWORD})
+        if res.status_code < 500 or attempt == SETUP_ATTEMPTS - 1:
+            break
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+async def run_verify(client, recorder, tokens, n):
+    token = tokens[n % len(tokens)]
+    await recorder.call(
+        "POST /verify-session",
+        client.post("/verify-session", json={"access_token": token}),
+        ok=lambda res: res.status_code == 200 and res.json().get("valid"),
+    )
+
+
+async def run_login(client, recorder, tokens, n):
+    await recorder.call("POST /login", client.post("/login", json={"email": f"load-{n}@example.com", "password": PASSWORD}))
+
+
+async def run_google(client, recorder, tokens, n):
+    res = await recorder.call("GET /auth/google", client.get("/auth/google"))
+    if res is None:
+        return
+    state = res.json()["state"]
+    # Браузер с Google пропускаем: сразу приходим на /callback с кодом, как после согласия
+    res = await recorder.call(
+        "GET /callback",
+        client.get("/callback", params={"code": f"load-{n}", "state": state}),
+        # Страница успеха; запасная страница с JS значит, что обмен кода не удался
+        ok=lambda res: res.status_code == 200 and "<h1>Вход выполнен" in res.text,
+    )
+    if res is None:
+        return
+    await recorder.call(
+        "GET /check-google",
+        client.get("/check-google", params={"state": state, "wait": 0}),
+        ok=lambda res: res.status_code == 200 and res.json().get("status") == "success",
+    )
+
+
+RUNNERS = {"verify": run_verify, "login": run_login, "google": run_google}
+
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def worker(client, recorder, mix, tokens, deadline, index, counter):
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(index)
+    while time.perf_counter() < deadline:
+        n = next(counter)
+        await RUNNERS[rng.choices(names, weights)[0]](client, recorder, tokens, n)
+
+
+async def run(args):
+    mix = parse_mix(args.mix) if args.scenario == "mixed" else {args.scenario: 1.0}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.backend, limits=limits, timeout=30) as client:
+        tokens = []
+        if "verify" in mix:
+            results = await asyncio.gather(
+                *(login(client, f"load-device-{i}@example.com") for i in range(args.tokens)),
+                return_exceptions=True,
+            )
+            tokens = [token for token in results if isinstance(token, str)]
+            if not tokens:
+                raise SystemExit(f"Не удалось войти ни одним устройством: {results[0]!r}")
+            if len(tokens) < args.tokens:
+                print(f"Подготовка: вошли {len(tokens)} из {args.tokens} устройств, продолжаем с ними")
+        recorder = Recorder()
+        counter = iter(range(10 ** 12))
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            worker(client, recorder, mix, tokens, deadline, i, counter) for i in range(args.concurrency)
+        ))
+        wall = time.perf_counter() - start
+
+    total = sum(len(v) for v in recorder.latencies.values())
+    print(f"{args.scenario}: {total} запросов за {wall:.1f} с, {total / wall:.1f} rps, "
+          f"ошибок {sum(recorder.errors.values())}")
+    print(f"{'эндпоинт':<24} {'запросов':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ошибок':>7}")
+    for endpoint in sorted(recorder.latencies):
+        stats = summarize(recorder.latencies[endpoint])
+        print(f"{endpoint:<24} {stats['count']:>9} {stats['count'] / wall:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {recorder.errors[endpoint]:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "mixed"], default="verify")
+    parser.add_argument("--mix", nargs="+", default=["verify=70", "login=20", "google=10"],
+                        help="веса сценариев для mixed, например verify=70 login=20 google=10")
+    parser.add_argument("--tokens", type=int, default=50, help="сколько разных устройств проверяют сессию")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
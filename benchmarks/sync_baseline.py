@@ -0,0 +1,89 @@
+"""Бэкенд со старого коммита (синхронные маршруты) против локального стенда - "до" для load_auth.
+
+До перевода маршрутов на async адрес Supabase был зашит в backend/main.py,
+и старый коммит, запущенный как есть, нагружал бы настоящий проект.
+Скрипт выгружает backend/ нужной ревизии во временную папку, заменяет
+в ней адрес Supabase на адрес стенда (benchmarks/fake_supabase.py),
+проверяет, что ссылок на *.supabase.co не осталось, и запускает uvicorn.
+
+По умолчанию берется родитель первого коммита [user-012] - последняя
+версия с синхронными маршрутами.
+
+Запуск из корня репозитория (стенд уже запущен на 9999):
+    python -m benchmarks.sync_baseline --port 8001
+    python -m benchmarks.load_auth --backend http://127.0.0.1:8001 --scenario verify
+"""
+import argparse
+import io
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+from benchmarks.fake_supabase import FAKE_JWT_SECRET
+
+HOSTED_URL = re.compile(r"https://[a-z0-9-]+\.supabase\.co")
+
+
+def git(*args):
+    return subprocess.check_output(["git", *args], text=True).strip()
+
+
+def default_revision():
+    commits = git("log", "--reverse", "--format=%H", "--grep", r"^\[user-012\]").splitlines()
+    if not commits:
+        raise SystemExit("Коммит [user-012] не найден: укажите --rev")
+    return f"{commits[0]}^"
+
+
+def export_backend(rev, target):
+    archive = subprocess.check_output(["git", "archive", "--format=tar", rev, "backend"])
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return Path(target) / "backend"
+
+
+def point_to_stand(backend_dir, supabase_url):
+    for path in backend_dir.rglob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        patched = HOSTED_URL.sub(supabase_url, source)
+        if patched != source:
+            path.write_text(patched, encoding="utf-8")
+    # Страховка: ни одна строка не должна вести на настоящий Supabase
+    leftovers = [str(p) for p in backend_dir.rglob("*") if p.is_file() and "supabase.co" in p.read_text(errors="ignore")]
+    if leftovers:
+        raise SystemExit(f"В бэкенде остались адреса Supabase: {leftovers}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rev", default=None, help="ревизия бэкенда (по умолчанию - до [user-012])")
+    parser.add_argument("--supabase-url", default="http://127.0.0.1:9999", help="адрес fake_supabase")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    rev = args.rev or default_revision()
+    with tempfile.TemporaryDirectory(prefix="emsana-baseline-") as tmp:
+        backend_dir = export_backend(rev, tmp)
+        point_to_stand(backend_dir, args.supabase_url)
+        print(f"Бэкенд {git('rev-parse', '--short', rev)} -> {args.supabase_url}, порт {args.port}")
+        # load_dotenv не перезаписывает заданные переменные: ключи из .env разработчика не попадут
+        env = dict(
+            os.environ,
+            SUPABASE_URL=args.supabase_url,
+            SUPABASE_SERVICE_KEY="fake",
+            SUPABASE_JWT_SECRET=FAKE_JWT_SECRET,
+        )
+        subprocess.run(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=backend_dir,
+            env=env,
+            check=False,
+        )
+
+
+if __name__ == "__main__":
+    main()
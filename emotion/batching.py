@@ -0,0 +1,77 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from emotion.faces import expand_box
+from emotion.preprocess import FacePreprocessor, to_gray
+
+# model.predict() для одиночного кадра тоже масштабирует до 640
+DEFAULT_IMGSZ = 640
+
+
+class EmotionResult(NamedTuple):
+    class_id: int
+    name: str
+    conf: float
+    # Максимальная уверенность по каждому классу (len == len(model.names))
+    scores: np.ndarray
+
+
+class BatchedEmotionClassifier:
+    """Классифицирует все лица кадра за один прямой проход YOLO."""
+
+    def __init__(self, model, imgsz=DEFAULT_IMGSZ, conf=0.45, device='cpu', max_batch=16):
+        self.model = model
+        self.names = model.names
+        self.imgsz = imgsz
+        self.conf = conf
+        self.device = device
+        self.max_batch = max_batch
+        # Буферы входа модели выделяются один раз и переиспользуются между кадрами
+        self.preprocessor = FacePreprocessor(imgsz, max_batch)
+
+    def _to_result(self, prediction) -> Optional[EmotionResult]:
+        boxes = prediction.boxes
+        if len(boxes) == 0:
+            return None
+        scores = np.zeros(len(self.names), dtype=np.float32)
+        for cls, conf in zip(boxes.cls.tolist(), boxes.conf.tolist()):
+            scores[int(cls)] = max(scores[int(cls)], conf)
+        class_id = int(scores.argmax())
+        return EmotionResult(class_id, self.names[class_id], float(scores[class_id]), scores)
+
+    def classify_crops(self, crops):
+        """Список вырезанных лиц -> список EmotionResult (или None) в том же порядке."""
+        results = []
+        for start in range(0, len(crops), self.max_batch):
+            batch = self.preprocessor.load(crops[start:start + self.max_batch])
+            predictions = self.model.predict(
+                source=batch, imgsz=self.imgsz, conf=self.conf, device=self.device, verbose=False
+            )
+            results.extend(self._to_result(p) for p in predictions)
+        return results
+
+    def crop_faces(self, gray, faces):
+        """ЧБ кадр + рамки (x, y, w, h) -> [(индекс рамки, (x1, y1, x2, y2), лицо), ...].
+
+        Лица - это view в кадр, без копирования. Пустые вырезки пропускаются,
+        поэтому индекс нужен, чтобы сопоставить лицо с рамкой.
+        """
+        crops = []
+        for i, face in enumerate(faces):
+            x1, y1, x2, y2 = expand_box(face, gray.shape)
+            face_crop = gray[y1:y2, x1:x2]
+            if face_crop.size == 0:
+                continue
+            crops.append((i, (x1, y1, x2, y2), face_crop))
+        return crops
+
+    def classify(self, frame, faces, gray=None):
+        """Кадр BGR + рамки (x, y, w, h) -> [((x1, y1, x2, y2), EmotionResult | None), ...].
+
+        Если ЧБ кадр уже посчитан (например, для Haar), его стоит передать в gray.
+        """
+        # Лица классифицируются черно-белыми (как в датасете)
+        crops = self.crop_faces(to_gray(frame) if gray is None else gray, faces)
+        results = self.classify_crops([crop for _, _, crop in crops])
+        return [(box, result) for (_, box, _), result in zip(crops, results)]
@@ -0,0 +1,32 @@
+import cv2
+
+# Параметры Haar Cascade (подобраны в MLtest.py)
+HAAR_SCALE_FACTOR = 1.1
+HAAR_MIN_NEIGHBORS = 5
+HAAR_MIN_SIZE = (50, 50)
+
+# Насколько расширяем рамку захвата, чтобы лицо влезло целиком (доля высоты)
+FACE_MARGIN = 0.1
+
+
+def load_face_cascade():
+    # Встроенный в OpenCV быстрый детектор лиц
+    return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+
+def detect_faces(face_cascade, gray_frame):
+    return face_cascade.detectMultiScale(
+        gray_frame,
+        scaleFactor=HAAR_SCALE_FACTOR,
+        minNeighbors=HAAR_MIN_NEIGHBORS,
+        minSize=HAAR_MIN_SIZE,
+    )
+
+
+def expand_box(box, frame_shape, margin=FACE_MARGIN):
+    """(x, y, w, h) -> (x1, y1, x2, y2) с отступом, обрезанный по границам кадра."""
+    x, y, w, h = (int(v) for v in box)
+    m = int(h * margin)
+    y1, y2 = max(0, y - m), min(frame_shape[0], y + h + m)
+    x1, x2 = max(0, x - m), min(frame_shape[1], x + w + m)
+    return x1, y1, x2, y2
@@ -0,0 +1,290 @@
+"""Пакетный анализ эмоций по записанным видео сессий.
+
+Каждое видео обрабатывается в отдельном процессе пула; анализируется
+каждый N-й кадр (--every) или кадры с заданной частотой (--fps).
+Результаты по кадрам пишутся потоково в CSV, Parquet или .npy рядом
+друг с другом в --out: одна строка на лицо.
+
+Запуск из корня репозитория:
+    python -m emotion.offline recordings/ --fps 5 --workers 8 --out timelines --format parquet
+"""
+import argparse
+import contextlib
+import csv
+import hashlib
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from emotion.faces import load_face_cascade
+from emotion.runtime import RUNTIME_BACKENDS, create_classifier, runtime_config
+from emotion.smoothing import EmotionSmoother
+from emotion.tracker import FaceTracker
+
+VIDEO_SUFFIXES = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v"}
+COLUMNS = ("frame", "time_s", "track_id", "x", "y", "w", "h", "emotion", "confidence")
+ROW_DTYPE = np.dtype([
+    ("frame", np.int32), ("time_s", np.float32), ("track_id", np.int32),
+    ("x", np.int16), ("y", np.int16), ("w", np.int16), ("h", np.int16),
+    ("emotion", "U16"), ("confidence", np.float32),
+])
+# Сколько строк копим перед записью в Parquet/.npy
+CHUNK_ROWS = 4096
+
+
+def find_videos(paths):
+    """-> [(видео, имя файла результата без расширения)].
+
+    Имя строится из пути относительно папки ввода (a/day1.mp4 -> a__day1),
+    чтобы одноименные видео из разных папок не писали в один файл; если
+    имена все же совпали (разные входы), к ним добавляется хеш пути.
+    """
+    videos, seen = [], set()
+    for path in map(Path, paths):
+        if path.is_dir():
+            found = sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_SUFFIXES)
+            named = [(p, "__".join(p.relative_to(path).with_suffix("").parts)) for p in found]
+        else:
+            named = [(path, path.stem)]
+        for video, name in named:
+            if video.resolve() not in seen:
+                seen.add(video.resolve())
+                videos.append((video, name))
+    counts = Counter(name for _, name in videos)
+    return [
+        (video, name if counts[name] == 1 else f"{name}-{hashlib.sha1(str(video.resolve()).encode()).hexdigest()[:8]}")
+        for video, name in videos
+    ]
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class NpyWriter:
+    """Строки сразу дописываются на диск во временный файл без заголовка.
+
+    Число строк в заголовке .npy известно только в конце, поэтому close()
+    создает .npy нужного размера через open_memmap и переносит в него
+    строки порциями по CHUNK_ROWS: в памяти никогда не лежит все видео.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._raw_path = self.path.with_name(self.path.name + ".rows")
+        self._raw = open(self._raw_path, "wb")
+        self._count = 0
+
+    def write(self, rows):
+        if rows:
+            self._raw.write(np.array(rows, dtype=ROW_DTYPE).tobytes())
+            self._count += len(rows)
+
+    def close(self):
+        self._raw.close()
+        try:
+            if not self._count:
+                np.save(self.path, np.empty(0, dtype=ROW_DTYPE))
+                return
+            raw = np.memmap(self._raw_path, dtype=ROW_DTYPE, mode="r", shape=(self._count,))
+            out = np.lib.format.open_memmap(self.path, mode="w+", dtype=ROW_DTYPE, shape=(self._count,))
+            for start in range(0, self._count, CHUNK_ROWS):
+                out[start:start + CHUNK_ROWS] = raw[start:start + CHUNK_ROWS]
+            out.flush()
+            del out, raw
+        finally:
+            self._raw_path.unlink(missing_ok=True)
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Для --format parquet нужен pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._schema = pa.schema([
+            ("frame", pa.int32()), ("time_s", pa.float32()), ("track_id", pa.int32()),
+            ("x", pa.int16()), ("y", pa.int16()), ("w", pa.int16()), ("h", pa.int16()),
+            ("emotion", pa.dictionary(pa.int8(), pa.string())), ("confidence", pa.float32()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows):
+        if rows:
+            columns = list(zip(*rows))
+            self._writer.write_table(self._pa.Table.from_arrays(
+                [self._pa.array(column).cast(field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema,
+            ))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter, "npy": NpyWriter}
+
+
+# Состояние процесса пула: модель и каскад загружаются один раз на процесс
+_worker = {}
+
+
+def _init_worker(options):
+    import torch
+    torch.set_num_threads(options["threads"])
+    _worker["options"] = options
+    _worker["cascade"] = load_face_cascade()
+    _worker["classifier"] = create_classifier(
+        options["weights"], options["backend"], options["imgsz"], options["int8"], options["int8_data"]
+    )
+
+
+def analyze_video(path, name):
+    options = _worker["options"]
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            return {"video": str(path), "error": "cannot open"}
+        output = Path(options["out"]) / f"{name}.{options['format']}"
+        writer = WRITERS[options["format"]](output)
+        try:
+            summary = _analyze(cap, writer)
+        except BaseException:
+            # Недописанный файл хуже отсутствующего: по нему нельзя понять, что видео не досчитано
+            with contextlib.suppress(Exception):
+                writer.close()
+            output.unlink(missing_ok=True)
+            raise
+        writer.close()
+    finally:
+        cap.release()
+    return {"video": str(path), "output": str(output), **summary}
+
+
+def _analyze(cap, writer):
+    options, classifier = _worker["options"], _worker["classifier"]
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    step = options["every"] or max(1, round(source_fps / options["fps"]))
+
+    tracker = FaceTracker(_worker["cascade"], detect_every=options["detect_every"])
+    smoother = EmotionSmoother(classifier.names, reclassify_every=1) if options["smooth"] else None
+
+    start = time.perf_counter()
+    index = analyzed = faces = 0
+    rows = []
+    while True:
+        # Пропускаемые кадры только демультиплексируются/декодируются, без перевода в BGR
+        if index % step:
+            if not cap.grab():
+                break
+            index += 1
+            continue
+        success, frame = cap.read()
+        if not success:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks = tracker.update(gray)
+        crops = classifier.crop_faces(gray, [track.box for track in tracks])
+        if smoother is None:
+            results = classifier.classify_crops([crop for _, _, crop in crops])
+        else:
+            results = smoother.step([(tracks[i].id, crop) for i, _, crop in crops], classifier.classify_crops)
+        time_s = index / source_fps
+        for (i, _, _), result in zip(crops, results):
+            if result is None:
+                continue
+            x, y, w, h = tracks[i].box
+            rows.append((index, time_s, tracks[i].id, x, y, w, h, result.name, result.conf))
+        if len(rows) >= CHUNK_ROWS:
+            writer.write(rows)
+            rows = []
+        analyzed += 1
+        faces += len(crops)
+        index += 1
+    writer.write(rows)
+    return {
+        "frames": index,
+        "analyzed": analyzed,
+        "faces": faces,
+        "duration_s": index / source_fps,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    config = runtime_config()
+    parser = argparse.ArgumentParser(description="Пакетный анализ эмоций по видео")
+    parser.add_argument("inputs", nargs="+", help="видеофайлы или папки с ними")
+    parser.add_argument("--out", default="emotion_timelines")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    skip = parser.add_mutually_exclusive_group()
+    skip.add_argument("--every", type=int, default=0, help="анализировать каждый N-й кадр")
+    skip.add_argument("--fps", type=float, default=5.0, help="анализировать кадры с такой частотой")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов в пуле")
+    parser.add_argument("--detect-every", type=int, default=1, help="полный Haar раз в N анализируемых кадров")
+    parser.add_argument("--smooth", action="store_true", help="сглаживать эмоции по трекам")
+    parser.add_argument("--weights", default="emotionsbest.pt")
+    parser.add_argument("--backend", choices=RUNTIME_BACKENDS, default=config["backend"])
+    parser.add_argument("--imgsz", type=int, default=config["imgsz"])
+    parser.add_argument("--int8", action="store_true", default=config["int8"])
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        raise SystemExit("Видео не найдены")
+    Path(args.out).mkdir(parents=True, exist_ok=True)
+    workers = min(args.workers, len(videos))
+    options = {
+        "out": args.out, "format": args.format, "every": args.every, "fps": args.fps,
+        "detect_every": args.detect_every, "smooth": args.smooth,
+        "weights": args.weights, "backend": args.backend, "imgsz": args.imgsz,
+        "int8": args.int8, "int8_data": config["int8_data"],
+        # Процессы и так занимают ядра: внутри каждого torch работает в меньшее число потоков
+        "threads": max(1, (os.cpu_count() or 1) // workers),
+    }
+    if args.backend != "torch":
+        # Экспортируем модель заранее, чтобы процессы пула не экспортировали ее одновременно
+        create_classifier(args.weights, args.backend, args.imgsz, args.int8, config["int8_data"])
+
+    start = time.perf_counter()
+    total_duration = 0.0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        futures = {pool.submit(analyze_video, video, name): video for video, name in videos}
+        for future in as_completed(futures):
+            # Одно битое видео не должно останавливать ночной прогон остальных
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"video": str(futures[future]), "error": f"{type(e).__name__}: {e}"}
+            if "error" in summary:
+                failed += 1
+                print(f"❌ {summary['video']}: {summary['error']}")
+                continue
+            total_duration += summary["duration_s"]
+            print(f"✓ {summary['video']}: {summary['analyzed']}/{summary['frames']} кадров, "
+                  f"{summary['faces']} лиц, {summary['seconds']:.1f} с -> {summary['output']}")
+    wall = time.perf_counter() - start
+    speed = total_duration / wall if wall else 0.0
+    print(f"Готово: {len(videos)} видео, {total_duration / 60:.1f} мин записи за {wall:.1f} с ({speed:.1f}x реального времени)")
+    if failed:
+        raise SystemExit(f"Не обработано видео: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import cv2
+
+# Сколько последних кадров камеры помнит отрисовка, чтобы подобрать кадр под результат;
+# если результат старше всех, показывается сам кадр, по которому он посчитан
+DISPLAY_HISTORY = 8
+
+
+class StageStats:
+    """Счетчики одной стадии: обработано, выброшено, задержка."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency):
+        with self._lock:
+            self.processed += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def drop(self, count=1):
+        with self._lock:
+            self.dropped += count
+
+    def snapshot(self, queue_depth=None):
+        with self._lock:
+            mean = self.total_latency / self.processed if self.processed else 0.0
+            return {
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "queue_depth": queue_depth,
+                "mean_ms": mean * 1000.0,
+                "last_ms": self.last_latency * 1000.0,
+                "max_ms": self.max_latency * 1000.0,
+            }
+
+
+class RingBuffer:
+    """Ограниченная очередь: при переполнении выбрасывает самый старый элемент."""
+
+    def __init__(self, maxlen, stats=None):
+        self._items = deque()
+        self._maxlen = maxlen
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = stats
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxlen:
+                self._items.popleft()
+                if self._stats:
+                    self._stats.drop()
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None, latest=False):
+        """Следующий элемент (или самый свежий при latest=True); None, если очередь закрыта/пуста."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            if latest:
+                stale = len(self._items) - 1
+                if stale and self._stats:
+                    self._stats.drop(stale)
+                item = self._items.pop()
+                self._items.clear()
+                return item
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Frame(NamedTuple):
+    index: int
+    timestamp: float
+    image: object
+
+
+class FrameJob(NamedTuple):
+    frame: Frame
+    gray: object
+    # [(track_id, (x, y, w, h)), ...] - снимок треков на момент кадра
+    faces: list
+
+
+class FrameResult(NamedTuple):
+    frame: Frame
+    # [((x1, y1, x2, y2), EmotionResult | None), ...]
+    emotions: list
+
+
+class EmotionPipeline:
+    """Захват -> детекция -> пул классификаторов -> отрисовка, каждая стадия в своем потоке.
+
+    Захват идет с частотой камеры, старые кадры и результаты выбрасываются,
+    а не копятся в очередях. Отрисовка накладывает эмоции самого свежего
+    готового результата и показывает кадр не новее, чем на max_lag кадров
+    позже этого результата: если классификация отстала, картинка
+    придерживается, и эмоция на экране не отстает от нее больше чем на
+    max_lag кадров. max_lag=None - всегда самый свежий кадр, с любым
+    отставанием эмоций.
+    """
+
+    def __init__(self, cap, tracker, classifier_factory, workers=2, ring_size=2, smoother=None, max_lag=1):
+        self.cap = cap
+        # FaceTracker: полный каскад раз в N кадров, между ними - слежение
+        self.tracker = tracker
+        # EmotionSmoother: сглаживание по трекам и повторное использование результатов
+        self.smoother = smoother
+        self.stats = {name: StageStats(name) for name in ("capture", "detect", "classify", "render")}
+        # Кольцевой буфер кадров камеры: детектор всегда берет самый свежий
+        self._frames = RingBuffer(ring_size, self.stats["capture"])
+        # Очередь задач классификации: не длиннее числа воркеров
+        self._jobs = RingBuffer(workers, self.stats["detect"])
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.max_lag = max_lag
+        self._display_frames = deque(maxlen=DISPLAY_HISTORY)
+        self._latest_result = None
+        self._shown_index = -1
+        self._shown_result_index = None
+
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._detect_loop, name="detect", daemon=True),
+        ]
+        for i in range(workers):
+            # У каждого воркера своя модель: YOLO не рассчитана на общий доступ из нескольких потоков
+            self._threads.append(
+                threading.Thread(target=self._classify_loop, args=(classifier_factory,), name=f"classify-{i}", daemon=True)
+            )
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._frames.close()
+        self._jobs.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def _capture_loop(self):
+        index = 0
+        while not self._stop.is_set() and self.cap.isOpened():
+            start = time.perf_counter()
+            success, image = self.cap.read()
+            if not success:
+                break
+            frame = Frame(index, time.perf_counter(), image)
+            self.stats["capture"].record(time.perf_counter() - start)
+            with self._lock:
+                self._display_frames.append(frame)
+            self._frames.put(frame)
+            index += 1
+        self._stop.set()
+        self._frames.close()
+        self._jobs.close()
+
+    def _detect_loop(self):
+        while not self._stop.is_set():
+            frame = self._frames.get(timeout=0.5, latest=True)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            # Переводим кадр в ЧБ для поиска лица
+            gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+            faces = [(track.id, track.box) for track in self.tracker.update(gray)]
+            self.stats["detect"].record(time.perf_counter() - start)
+            self._jobs.put(FrameJob(frame, gray, faces))
+
+    def _classify_loop(self, classifier_factory):
+        classifier = classifier_factory()
+        while not self._stop.is_set():
+            job = self._jobs.get(timeout=0.5)
+            if job is None:
+                continue
+            start = time.perf_counter()
+            boxes = [box for _, box in job.faces]
+            if self.smoother is None:
+                emotions = classifier.classify(job.frame.image, boxes, gray=job.gray)
+            else:
+                crops = classifier.crop_faces(job.gray, boxes)
+                results = self.smoother.step([(job.faces[i][0], crop) for i, _, crop in crops], classifier.classify_crops)
+                emotions = [(box, result) for (_, box, _), result in zip(crops, results)]
+            self.stats["classify"].record(time.perf_counter() - start)
+            self._publish(FrameResult(job.frame, emotions))
+
+    def _publish(self, result):
+        with self._lock:
+            # Воркеры могут закончить не по порядку: более старый результат не показываем
+            if self._latest_result is not None and result.frame.index <= self._latest_result.frame.index:
+                self.stats["classify"].drop()
+                return
+            self._latest_result = result
+
+    def render(self, draw):
+        """Отдает кадр камеры с наложенными эмоциями последнего результата.
+
+        draw(image, emotions) рисует поверх копии кадра. Кадр - самый
+        свежий, но не дальше max_lag от результата. Возвращает None, если
+        показывать нечего нового (в том числе пока кадр придержан).
+        """
+        with self._lock:
+            frames, result = list(self._display_frames), self._latest_result
+        if not frames:
+            return None
+        frame = frames[-1]
+        if result is not None and self.max_lag is not None and frame.index - result.frame.index > self.max_lag:
+            matching = [f for f in frames if f.index <= result.frame.index + self.max_lag]
+            # Результат старше всей истории (медленная классификация на CPU):
+            # показываем кадр, на котором он посчитан, - эмоция совпадает с картинкой
+            frame = matching[-1] if matching else result.frame
+        # Назад по времени не показываем: ждем, пока классификация догонит уже показанный кадр
+        if frame.index <= self._shown_index:
+            return None
+        start = time.perf_counter()
+        image = frame.image.copy()
+        if result is not None:
+            draw(image, result.emotions)
+        self._shown_index = frame.index
+        self._shown_result_index = result.frame.index if result is not None else None
+        self.stats["render"].record(time.perf_counter() - start)
+        return image
+
+    def lag_frames(self):
+        """На сколько кадров показанные эмоции отстают от показанного кадра (None - эмоций нет)."""
+        if self._shown_result_index is None:
+            return None
+        return max(0, self._shown_index - self._shown_result_index)
+
+    def snapshot(self):
+        depths = {"capture": len(self._frames), "detect": len(self._jobs)}
+        report = {name: stats.snapshot(depths.get(name)) for name, stats in self.stats.items()}
+        report["lag_frames"] = self.lag_frames()
+        if self.smoother is not None:
+            report["smoother"] = self.smoother.snapshot()
+        return report
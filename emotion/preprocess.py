@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+import torch
+
+# Цвет полей letterbox, как в ultralytics
+LETTERBOX_COLOR = 114
+
+
+def to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+class FacePreprocessor:
+    """Готовит батч лиц для модели без лишних копий.
+
+    Лица приходят вырезками (view) из ЧБ кадра и масштабируются сразу в
+    заранее выделенный буфер (max_batch, imgsz, imgsz). Модель ждет 3 канала:
+    ЧБ канал размножается через expand, без копирования. Буферы живут между
+    кадрами, поэтому батч нельзя держать дольше одного вызова модели.
+    """
+
+    def __init__(self, imgsz, max_batch=16):
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        self._pixels = np.full((max_batch, imgsz, imgsz), LETTERBOX_COLOR, dtype=np.uint8)
+        self._tensor = torch.empty((max_batch, 1, imgsz, imgsz), dtype=torch.float32)
+
+    def _letterbox_into(self, crop, slot):
+        h, w = crop.shape[:2]
+        scale = self.imgsz / max(h, w)
+        new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+        top, left = (self.imgsz - new_h) // 2, (self.imgsz - new_w) // 2
+        slot.fill(LETTERBOX_COLOR)
+        # Масштабируем прямо в нужный участок буфера, без промежуточного массива
+        cv2.resize(crop, (new_w, new_h), dst=slot[top:top + new_h, left:left + new_w], interpolation=cv2.INTER_LINEAR)
+
+    def load(self, crops):
+        """Список лиц (ЧБ, или BGR - будет переведено) -> тензор (N, 3, imgsz, imgsz) в [0, 1]."""
+        count = len(crops)
+        if count > self.max_batch:
+            raise ValueError(f"Batch of {count} faces exceeds max_batch={self.max_batch}")
+        for i, crop in enumerate(crops):
+            self._letterbox_into(to_gray(crop), self._pixels[i])
+        tensor = self._tensor[:count]
+        torch.div(torch.from_numpy(self._pixels[:count]).unsqueeze(1), 255.0, out=tensor)
+        return tensor.expand(count, 3, self.imgsz, self.imgsz)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+from emotion.batching import DEFAULT_IMGSZ, BatchedEmotionClassifier
+
+RUNTIME_BACKENDS = ("torch", "onnx", "openvino")
+# Лица маленькие: экспортированным моделям хватает фиксированного небольшого входа
+FACE_IMGSZ = 320
+
+
+def runtime_config():
+    """Настройки рантайма из окружения: EMOTION_BACKEND, EMOTION_IMGSZ, EMOTION_INT8, EMOTION_INT8_DATA."""
+    imgsz = os.getenv("EMOTION_IMGSZ")
+    return {
+        "backend": os.getenv("EMOTION_BACKEND", "torch"),
+        "imgsz": int(imgsz) if imgsz else None,
+        "int8": os.getenv("EMOTION_INT8", "0") == "1",
+        "int8_data": os.getenv("EMOTION_INT8_DATA"),
+    }
+
+
+def runtime_name(backend, int8=False):
+    """Имя рантайма как в --backends бенчмарков: "torch", "onnx+int8", ..."""
+    return backend + ("+int8" if int8 else "")
+
+
+def export_path(weights, backend, imgsz, int8=False, int8_data=None):
+    weights = Path(weights)
+    suffix = f"_{imgsz}" + ("_int8" if int8 else "")
+    if int8 and int8_data:
+        # Другой набор калибровки - другая модель, а не та же под старым именем
+        suffix += "_" + hashlib.sha1(str(Path(int8_data).resolve()).encode()).hexdigest()[:8]
+    if backend == "onnx":
+        return weights.with_name(f"{weights.stem}{suffix}.onnx")
+    if backend == "openvino":
+        return weights.with_name(f"{weights.stem}{suffix}_openvino_model")
+    raise ValueError(f"Unknown runtime backend: {backend}")
+
+
+def _quantize_onnx(source, target):
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(source), str(target), weight_type=QuantType.QUInt8)
+    # ultralytics берет names/stride/imgsz из метаданных модели: переносим их в квантованную
+    original, quantized = onnx.load(str(source)), onnx.load(str(target))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, str(target))
+
+
+def export_model(weights, backend, imgsz, int8=False, int8_data=None):
+    """Экспортирует .pt в ONNX/OpenVINO рядом с весами; повторно не экспортирует, если веса не менялись."""
+    from ultralytics import YOLO
+
+    target = export_path(weights, backend, imgsz, int8, int8_data)
+    # Экспорт устарел, если после него менялись веса или (для INT8) файл набора калибровки
+    sources = [Path(weights)] + ([Path(int8_data)] if int8 and int8_data and Path(int8_data).exists() else [])
+    if target.exists() and all(target.stat().st_mtime >= source.stat().st_mtime for source in sources):
+        return target
+
+    model = YOLO(weights)
+    if backend == "onnx":
+        exported = Path(model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True, verbose=False))
+        if int8:
+            _quantize_onnx(exported, target)
+            exported.unlink()
+        else:
+            exported.replace(target)
+    elif backend == "openvino":
+        if int8 and not int8_data:
+            # Без своих лиц для калибровки ultralytics откалибрует INT8 на COCO - точность не гарантирована
+            raise ValueError("OpenVINO INT8 needs a calibration dataset (EMOTION_INT8_DATA)")
+        options = {"data": int8_data} if int8 else {}
+        exported = Path(model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, verbose=False, **options))
+        if target.exists():
+            shutil.rmtree(target)
+        exported.replace(target)
+    else:
+        raise ValueError(f"Unknown runtime backend: {backend}")
+    return target
+
+
+def load_emotion_model(weights, backend="torch", imgsz=None, int8=False, int8_data=None):
+    """-> (модель YOLO, размер входа, фактический рантайм - см. runtime_name).
+
+    Если экспорт или загрузка ONNX/OpenVINO не удались, откатывается на
+    PyTorch; у PyTorch INT8 нет, так что int8 для него игнорируется.
+    Что запрошено и что запустилось, может различаться - сравнивайте.
+    """
+    from ultralytics import YOLO
+
+    if backend not in RUNTIME_BACKENDS:
+        raise ValueError(f"Unknown runtime backend: {backend} (expected one of {RUNTIME_BACKENDS})")
+    if backend != "torch":
+        size = imgsz or FACE_IMGSZ
+        try:
+            path = export_model(weights, backend, size, int8, int8_data)
+            return YOLO(str(path), task="detect"), size, runtime_name(backend, int8)
+        except Exception as e:
+            print(f"❌ Ошибка: рантайм {runtime_name(backend, int8)} недоступен, используем PyTorch: {e}")
+    return YOLO(weights), imgsz or DEFAULT_IMGSZ, runtime_name("torch")
+
+
+def create_classifier(weights, backend="torch", imgsz=None, int8=False, int8_data=None, conf=0.45):
+    """Классификатор; classifier.runtime - рантайм, который на самом деле загружен."""
+    model, size, runtime = load_emotion_model(weights, backend, imgsz, int8, int8_data)
+    classifier = BatchedEmotionClassifier(model, imgsz=size, conf=conf, device='cpu')
+    classifier.runtime = runtime
+    return classifier
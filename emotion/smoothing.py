@@ -0,0 +1,122 @@
+import threading
+
+import cv2
+import numpy as np
+
+from emotion.batching import EmotionResult
+
+# Размер уменьшенной копии лица для сравнения "изменилось ли лицо"
+THUMB_SIZE = 16
+
+
+def face_thumb(crop):
+    if crop.ndim == 3:
+        crop = crop[:, :, 0]
+    return cv2.resize(crop, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class TrackEmotion:
+    def __init__(self, num_classes):
+        self.probs = np.zeros(num_classes, dtype=np.float32)
+        self.thumb = None
+        self.frames_since = 0
+        self.idle = 0
+
+
+class EmotionSmoother:
+    """Сглаживание эмоций по трекам лиц и пропуск лишних вызовов модели.
+
+    Вероятности классов каждого трека усредняются экспонентой (alpha - вес
+    нового ответа модели). Лицо классифицируется заново только раз в
+    reclassify_every кадров или если его уменьшенная копия заметно изменилась
+    (средняя разница яркости больше change_threshold из 255); иначе берется
+    сглаженный прошлый результат.
+    """
+
+    def __init__(self, names, alpha=0.4, reclassify_every=10, change_threshold=12.0, min_conf=0.25, max_idle=30):
+        self.names = names
+        self.alpha = alpha
+        self.reclassify_every = reclassify_every
+        self.change_threshold = change_threshold
+        self.min_conf = min_conf
+        self.max_idle = max_idle
+        self.model_calls = 0
+        self.reused = 0
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _needs_classification(self, state, thumb):
+        if state.thumb is None or state.frames_since >= self.reclassify_every:
+            return True
+        return float(np.abs(thumb - state.thumb).mean()) > self.change_threshold
+
+    def _smoothed(self, state):
+        class_id = int(state.probs.argmax())
+        conf = float(state.probs[class_id])
+        if conf < self.min_conf:
+            return None
+        return EmotionResult(class_id, self.names[class_id], conf, state.probs.copy())
+
+    def step(self, faces, classify_crops):
+        """faces: [(track_id, лицо), ...] одного кадра -> [EmotionResult | None, ...] в том же порядке.
+
+        classify_crops вызывается не больше одного раза, только для лиц,
+        которые нужно переклассифицировать.
+        """
+        pending = []
+        with self._lock:
+            active = set()
+            for i, (track_id, crop) in enumerate(faces):
+                active.add(track_id)
+                state = self._states.setdefault(track_id, TrackEmotion(len(self.names)))
+                state.idle = 0
+                thumb = face_thumb(crop)
+                if self._needs_classification(state, thumb):
+                    # Отмечаем сразу, чтобы параллельный воркер не классифицировал то же лицо
+                    state.thumb = thumb
+                    state.frames_since = 0
+                    pending.append(i)
+                else:
+                    state.frames_since += 1
+                    self.reused += 1
+            self._prune(active)
+            self.model_calls += len(pending)
+
+        if pending:
+            results = classify_crops([faces[i][1] for i in pending])
+            with self._lock:
+                for i, result in zip(pending, results):
+                    state = self._states.get(faces[i][0])
+                    if state is None:
+                        continue
+                    scores = result.scores if result is not None else np.zeros_like(state.probs)
+                    if not state.probs.any():
+                        state.probs[:] = scores
+                    else:
+                        state.probs *= 1.0 - self.alpha
+                        state.probs += self.alpha * scores
+
+        with self._lock:
+            return [
+                self._smoothed(self._states[track_id]) if track_id in self._states else None
+                for track_id, _ in faces
+            ]
+
+    def _prune(self, active):
+        # Треки, которых давно нет в кадре, забываем
+        for track_id in list(self._states):
+            if track_id not in active:
+                state = self._states[track_id]
+                state.idle += 1
+                if state.idle > self.max_idle:
+                    del self._states[track_id]
+
+    def snapshot(self):
+        with self._lock:
+            total = self.model_calls + self.reused
+            return {
+                "tracks": len(self._states),
+                "model_calls": self.model_calls,
+                "reused": self.reused,
+                "reuse_ratio": self.reused / total if total else 0.0,
+            }
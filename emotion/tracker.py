@@ -0,0 +1,106 @@
+import itertools
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from emotion.faces import detect_faces
+
+# Шаблон лица хранится уменьшенным до этой ширины: сопоставление идет в разы быстрее
+TEMPLATE_WIDTH = 32
+
+
+def iou(a, b):
+    """Пересечение над объединением для рамок (x, y, w, h)."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+@dataclass
+class Track:
+    id: int
+    box: tuple  # (x, y, w, h)
+    confidence: float
+    template: np.ndarray
+    scale: float
+
+
+class FaceTracker:
+    """Полный Haar раз в detect_every кадров, между ними - поиск шаблона рядом с прошлой рамкой.
+
+    detect_every=1 дает прежнее поведение (каскад на каждом кадре), но со
+    стабильными ID лиц. Если совпадение шаблона падает ниже min_confidence,
+    лицо считается потерянным и на следующем кадре снова запускается каскад.
+    """
+
+    def __init__(self, face_cascade, detect_every=5, search_padding=0.5, min_confidence=0.6, iou_threshold=0.3):
+        self.face_cascade = face_cascade
+        self.detect_every = max(1, detect_every)
+        self.search_padding = search_padding
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.tracks = []
+        self.detections = 0
+        self._ids = itertools.count(1)
+        self._since_detect = 0
+        self._force_detect = True
+
+    def update(self, gray):
+        if self._force_detect or self._since_detect >= self.detect_every - 1:
+            self._detect(gray)
+        else:
+            self._follow(gray)
+        return list(self.tracks)
+
+    def _make_track(self, track_id, box, gray):
+        x, y, w, h = box
+        scale = TEMPLATE_WIDTH / w
+        template = cv2.resize(gray[y:y + h, x:x + w], (TEMPLATE_WIDTH, max(1, round(h * scale))))
+        return Track(track_id, box, 1.0, template, scale)
+
+    def _detect(self, gray):
+        self.detections += 1
+        self._since_detect = 0
+        self._force_detect = False
+        unmatched = list(self.tracks)
+        tracks = []
+        for box in detect_faces(self.face_cascade, gray):
+            box = tuple(int(v) for v in box)
+            best = max(unmatched, key=lambda t: iou(t.box, box), default=None)
+            if best is not None and iou(best.box, box) >= self.iou_threshold:
+                unmatched.remove(best)
+                track_id = best.id
+            else:
+                track_id = next(self._ids)
+            tracks.append(self._make_track(track_id, box, gray))
+        self.tracks = tracks
+
+    def _follow(self, gray):
+        self._since_detect += 1
+        height, width = gray.shape[:2]
+        alive = []
+        for track in self.tracks:
+            x, y, w, h = track.box
+            pad_x, pad_y = int(w * self.search_padding), int(h * self.search_padding)
+            x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+            x2, y2 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+            region = cv2.resize(gray[y1:y2, x1:x2], None, fx=track.scale, fy=track.scale)
+            th, tw = track.template.shape[:2]
+            if region.shape[0] < th or region.shape[1] < tw:
+                self._force_detect = True
+                continue
+            scores = cv2.matchTemplate(region, track.template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+            if score < self.min_confidence:
+                # Лицо потеряно: на следующем кадре ищем заново полным каскадом
+                self._force_detect = True
+                continue
+            track.box = (x1 + round(mx / track.scale), y1 + round(my / track.scale), w, h)
+            track.confidence = float(score)
+            alive.append(track)
+        self.tracks = alive
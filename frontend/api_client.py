@@ -0,0 +1,89 @@
+import logging
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Адрес бэкенда: на телефоне это не 127.0.0.1, поэтому задается снаружи
+API_URL = os.getenv("EMSANA_API_URL", "http://127.0.0.1:8000")
+# (подключение, чтение), секунд: зависший бэкенд не должен морозить интерфейс
+DEFAULT_TIMEOUT = (3.05, 10)
+# Сколько раз повторяем идемпотентный запрос после сетевой ошибки или 502/503/504
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.3
+BACKOFF_MAX = 3.0
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# retry=RETRY_CONNECT: повторять, только если запрос точно не дошел до сервера
+RETRY_CONNECT = "connect"
+
+log = logging.getLogger("emsana.api")
+
+
+def _not_sent(error):
+    """Подключиться не удалось - значит, сервер запроса не видел."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class ApiClient:
+    """Общий клиент бэкенда EmSana поверх одной keep-alive сессии requests.
+
+    Идемпотентные запросы (GET и явно помеченные retry=True) повторяются
+    с экспоненциальной задержкой и полным джиттером; время каждого ответа
+    пишется в лог "emsana.api". Запросы с побочным эффектом на каждый
+    вызов (новый OAuth state, письмо) помечаются retry=RETRY_CONNECT и
+    повторяются, только если не удалось подключиться.
+    """
+
+    def __init__(self, base_url=API_URL, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def request(self, method, path, timeout=None, retry=None, **kwargs):
+        """-> requests.Response. Сетевые ошибки последней попытки пробрасываются."""
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.retries if retry else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            start = time.perf_counter()
+            try:
+                res = self.session.request(method, self.url(path), timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                log.warning("%s %s failed after %.0f ms (attempt %d/%d): %s",
+                            method, path, (time.perf_counter() - start) * 1000, attempt + 1, attempts, e)
+                if last or (retry == RETRY_CONNECT and not _not_sent(e)):
+                    raise
+            else:
+                log.info("%s %s -> %d in %.0f ms", method, path, res.status_code, (time.perf_counter() - start) * 1000)
+                # Ответ 5xx значит, что сервер запрос видел: для RETRY_CONNECT не повторяем
+                if last or retry == RETRY_CONNECT or res.status_code not in RETRY_STATUSES:
+                    return res
+            time.sleep(self._backoff(attempt))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,65 @@
+import json
+
+from asset_variants import ASSETS_DIR, DERIVED_DIR, SUPPORTED_FORMATS, pick_variant
+
+MANIFEST_PATH = ASSETS_DIR / "manifest.json"
+MANIFEST_VERSION = 1
+# Opus играется не на всех платформах Flutter
+AUDIO_FORMATS = ("mp3",)
+
+
+class AssetManifest:
+    """Карточки и категории из assets/manifest.json (tools/build_manifest.py).
+
+    Весь индекс - один небольшой файл: при старте читается он, а не дерево
+    папок. Карточка по ID и список карточек категории берутся из словарей.
+    """
+
+    def __init__(self, data):
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+        self.content_hash = data["content_hash"]
+        self.cards = data["cards"]
+        self.categories = data["categories"]
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def card(self, card_id):
+        return self.cards.get(card_id)
+
+    def category(self, key):
+        return self.categories.get(key)
+
+    def roots(self):
+        return [key for key, category in self.categories.items() if category["parent"] is None]
+
+    def children(self, key):
+        return self.categories[key]["children"]
+
+    def cards_in(self, key):
+        return [self.cards[card_id] for card_id in self.categories[key]["cards"]]
+
+    def audio_path(self, card, lang="ru", formats=AUDIO_FORMATS):
+        """Путь к звуку карточки на языке lang (или на любом другом, если такого нет).
+
+        Нормализованный вариант (tools/normalize_audio.py) предпочтительнее оригинала.
+        """
+        audio = card["audio"]
+        entry = audio.get(lang) or next(iter(audio.values()), None)
+        if entry is None:
+            return None
+        for variant in entry.get("variants", ()):
+            if variant["format"] in formats:
+                return DERIVED_DIR / variant["path"]
+        return ASSETS_DIR / entry["path"]
+
+    def image_path(self, card, width, pixel_ratio=1.0, formats=SUPPORTED_FORMATS):
+        """Самая маленькая копия картинки не уже width * pixel_ratio; оригинал, если копий нет."""
+        image = card["image"]
+        if image is None:
+            return None
+        best = pick_variant(image.get("variants", ()), width * pixel_ratio, formats)
+        return DERIVED_DIR / best["path"] if best else ASSETS_DIR / image["path"]
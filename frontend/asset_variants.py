@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+
+# Корень assets/; в собранном приложении задается снаружи
+ASSETS_DIR = Path(os.getenv("EMSANA_ASSETS_DIR", Path(__file__).resolve().parent.parent / "assets"))
+DERIVED_DIR = ASSETS_DIR / "_derived"
+# Flutter декодирует WebP и JPEG везде, AVIF - не на всех платформах
+SUPPORTED_FORMATS = ("webp", "jpeg")
+
+
+def _rank(variant, need):
+    # Подходящая копия лучше неподходящей; из подходящих - самая узкая,
+    # из неподходящих - самая широкая; при равной ширине - меньший файл
+    fits = variant["width"] >= need
+    return (not fits, variant["width"] if fits else -variant["width"], variant["bytes"])
+
+
+def pick_variant(variants, need, formats=SUPPORTED_FORMATS):
+    """-> самая маленькая копия не уже need пикселей, иначе самая крупная; None, если копий нет."""
+    candidates = [v for v in variants if v["format"] in formats]
+    return min(candidates, key=lambda v: _rank(v, need), default=None)
+
+
+class DerivativeIndex:
+    """Уменьшенные копии картинок из assets/_derived/index.json (tools/build_derivatives.py)."""
+
+    def __init__(self, sources, derived_dir=DERIVED_DIR):
+        self.sources = sources
+        self.derived_dir = Path(derived_dir)
+
+    @classmethod
+    def load(cls, derived_dir=DERIVED_DIR):
+        """Пустой индекс, если копии еще не собраны: тогда отдаются оригиналы."""
+        try:
+            with open(Path(derived_dir) / "index.json", encoding="utf-8") as f:
+                return cls(json.load(f).get("sources", {}), derived_dir)
+        except (OSError, ValueError):
+            return cls({}, derived_dir)
+
+    def pick(self, source, width, pixel_ratio=1.0, formats=SUPPORTED_FORMATS):
+        """-> путь к самой маленькой копии source не уже width * pixel_ratio пикселей.
+
+        source - путь картинки относительно assets/. Если копий нет - оригинал.
+        """
+        best = pick_variant(self.sources.get(source, {}).get("variants", ()), width * pixel_ratio, formats)
+        if best is None:
+            return ASSETS_DIR / source
+        return self.derived_dir / best["path"]
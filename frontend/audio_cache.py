@@ -0,0 +1,102 @@
+import base64
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import flet as ft
+
+# Сколько байт звуков держим в памяти (считается по base64, как они и лежат в плеерах)
+AUDIO_CACHE_BUDGET = int(os.getenv("EMSANA_AUDIO_CACHE_BUDGET", str(8 * 1024 * 1024)))
+
+log = logging.getLogger("emsana.audio")
+
+
+class AudioCache:
+    """Заранее загруженные плееры звуков карточек с вытеснением LRU по объему.
+
+    preload() читает звуки видимой категории с диска и кладет готовые
+    ft.Audio в page.overlay, так что нажатие на карточку только запускает
+    уже подготовленный плеер, без чтения файла. Звуки сверх бюджета
+    вытесняются, начиная с давно не игравших. preload() блокирует на
+    чтении файлов - вызывать из фоновой задачи (TaskRunner).
+    """
+
+    def __init__(self, page, budget_bytes=AUDIO_CACHE_BUDGET):
+        self.page = page
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self._players = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self, path):
+        with open(path, "rb") as f:
+            data = base64.b64encode(f.read()).decode()
+        return ft.Audio(src_base64=data, autoplay=False, release_mode=ft.audio.ReleaseMode.STOP), len(data)
+
+    def _insert(self, path, player, size):
+        self._players[path] = (player, size)
+        self.size_bytes += size
+        self.page.overlay.append(player)
+        # Звук, который только что добавили, не вытесняем, даже если он один больше бюджета
+        while self.size_bytes > self.budget_bytes and len(self._players) > 1:
+            _, (old, old_size) = self._players.popitem(last=False)
+            self.size_bytes -= old_size
+            self.page.overlay.remove(old)
+            self.evictions += 1
+
+    def preload(self, paths):
+        """Готовит плееры для paths (обычно - звуки открытой категории)."""
+        paths = [str(p) for p in paths if p]
+        with self._lock:
+            missing = [p for p in paths if p not in self._players]
+        loaded = []
+        for path in missing:
+            try:
+                loaded.append((path, *self._load(path)))
+            except OSError as e:
+                log.warning("cannot preload %s: %s", path, e)
+        with self._lock:
+            for path, player, size in loaded:
+                if path not in self._players:
+                    self._insert(path, player, size)
+            # Звуки видимой категории - самые свежие: вытесняются последними
+            for path in paths:
+                if path in self._players:
+                    self._players.move_to_end(path)
+        if loaded:
+            self.page.update()
+
+    def play(self, path):
+        path = str(path)
+        start = time.perf_counter()
+        with self._lock:
+            item = self._players.get(path)
+            if item is not None:
+                self.hits += 1
+                self._players.move_to_end(path)
+                player = item[0]
+            else:
+                self.misses += 1
+                player, size = self._load(path)
+                self._insert(path, player, size)
+        if item is None:
+            # Промах: новый плеер должен сначала попасть на страницу
+            self.page.update()
+        player.seek(0)
+        player.play()
+        log.debug("play %s in %.1f ms", path, (time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "players": len(self._players),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,216 @@
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import flet as ft
+
+from asset_manifest import MANIFEST_PATH, AssetManifest
+
+# Ширина плитки, логических пикселей; картинка берется из копий tools/build_derivatives.py
+TILE_SIZE = 160
+# Flet не сообщает плотность экрана: берем типичную для планшета, с запасом
+THUMB_PIXEL_RATIO = float(os.getenv("EMSANA_THUMB_PIXEL_RATIO", "2"))
+# Столько плиток добавляется в сетку за раз, когда прокрутка подходит к концу
+PAGE_SIZE = 24
+# Сколько миниатюр держим на экране и рядом с ним; остальные заменяются заглушкой
+MAX_LIVE_THUMBNAILS = int(os.getenv("EMSANA_MAX_LIVE_THUMBNAILS", "48"))
+# Сколько рядов сверху и снизу от видимых держим с картинками
+WINDOW_MARGIN_ROWS = 2
+SPACING = 12
+LABEL_HEIGHT = 28
+ALL_CARDS = None
+
+log = logging.getLogger("emsana.board")
+
+
+class CardBoard:
+    """Доска карточек пространства ребенка: сетка, которая грузит только видимое.
+
+    ft.GridView строит на клиенте только плитки в области прокрутки, а
+    плитки в сетку добавляются порциями по PAGE_SIZE, когда прокрутка
+    подходит к концу: даже вся библиотека не уходит клиенту целиком.
+    Картинки - уменьшенные копии под размер плитки (их Flutter декодирует
+    сам, вне UI-потока); у плиток вдали от видимой области картинка
+    заменяется заглушкой, так что живых миниатюр не больше
+    MAX_LIVE_THUMBNAILS и память не растет при прокрутке. Нажатие играет
+    звук из AudioCache; звуки открытой категории загружаются заранее.
+    """
+
+    def __init__(self, page, tasks, audio, max_live=MAX_LIVE_THUMBNAILS):
+        self.page = page
+        self.tasks = tasks
+        self.audio = audio
+        self.max_live = max_live
+        self.manifest = None
+        self._manifest_mtime = None
+        self.category = ALL_CARDS
+        self._cards = []
+        self._holders = []
+        self._live = OrderedDict()
+        self._visible = (0, 0)
+        self._lock = threading.RLock()
+
+        self.grid = ft.GridView(
+            expand=True,
+            max_extent=TILE_SIZE + SPACING,
+            child_aspect_ratio=TILE_SIZE / (TILE_SIZE + LABEL_HEIGHT),
+            spacing=SPACING,
+            run_spacing=SPACING,
+            padding=SPACING,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100,
+        )
+        self.categories = ft.Row(scroll=ft.ScrollMode.AUTO, spacing=8)
+        self.status = ft.Text("", color=ft.Colors.GREY_400)
+        self.view = ft.Column([self.categories, self.status, self.grid], expand=True)
+
+    def open(self):
+        """Вызывается при каждом показе экрана; сетка пересобирается, только если сменился манифест.
+
+        Манифест читается в фоне: при первом показе - всегда, потом - если
+        у manifest.json сменилось время изменения. Открытая категория и
+        прокрутка при повторном показе сохраняются.
+        """
+        if self.manifest is None:
+            self.status.value = "Загрузка..."
+        self.tasks.run(self._load_if_changed, on_done=self._loaded, on_error=self._failed)
+
+    def _load_if_changed(self, task):
+        mtime = MANIFEST_PATH.stat().st_mtime_ns
+        if mtime == self._manifest_mtime:
+            return None
+        return mtime, AssetManifest.load()
+
+    def _loaded(self, result):
+        if result is None:
+            return
+        self._manifest_mtime, manifest = result
+        self.manifest = manifest
+        self.categories.controls = [self._chip("Все", ALL_CARDS)] + [
+            self._chip(manifest.category(key)["label"], key)
+            for key in manifest.categories
+            if manifest.category(key)["cards"]
+        ]
+        # Категория могла исчезнуть из нового манифеста
+        self._select(self.category if manifest.category(self.category) else ALL_CARDS)
+
+    def _failed(self, e):
+        log.warning("cannot load manifest: %s", e)
+        # Уже показанные карточки оставляем: не удалось только обновить их
+        if self.manifest is None:
+            self.status.value = "Карточки не найдены. Соберите манифест (tools/build_manifest.py)."
+
+    def _chip(self, label, key):
+        return ft.TextButton(label, data=key, on_click=lambda e: self._pick(e.control.data))
+
+    def _pick(self, category):
+        if category != self.category:
+            self._select(category)
+            self.page.update()
+
+    def _select(self, category):
+        with self._lock:
+            self.category = category
+            if category is ALL_CARDS:
+                self._cards = list(self.manifest.cards.values())
+            else:
+                self._cards = self.manifest.cards_in(category)
+            self._holders = []
+            self._live.clear()
+            self.grid.controls = []
+            self._append_page()
+            self._update_window(0, PAGE_SIZE)
+            # Новое содержимое показываем с начала, иначе окно видимых плиток не совпадет с экраном
+            if self.grid.page:
+                self.grid.scroll_to(offset=0, duration=0)
+            for chip in self.categories.controls:
+                chip.style = ft.ButtonStyle(color=ft.Colors.BLUE_400 if chip.data == category else ft.Colors.WHITE)
+            self.status.value = "" if self._cards else "В этой категории пока нет карточек."
+        if category is not ALL_CARDS:
+            # Вся библиотека в бюджет звуков не влезет: заранее - только выбранная категория
+            paths = [self.manifest.audio_path(card) for card in self._cards]
+            self.tasks.run(lambda task: self.audio.preload(paths))
+
+    def _append_page(self):
+        start = len(self.grid.controls)
+        for index in range(start, min(start + PAGE_SIZE, len(self._cards))):
+            card = self._cards[index]
+            holder = ft.Container(content=self._placeholder(), expand=True, alignment=ft.alignment.center)
+            self._holders.append(holder)
+            self.grid.controls.append(ft.Container(
+                content=ft.Column(
+                    [holder, ft.Text(card["label"], size=14, color=ft.Colors.WHITE, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)],
+                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                    spacing=4,
+                ),
+                border_radius=16,
+                ink=True,
+                on_click=lambda e, card=card: self._play(card),
+            ))
+
+    def _thumbnail(self, card):
+        path = self.manifest.image_path(card, TILE_SIZE, THUMB_PIXEL_RATIO)
+        if path is None:
+            return ft.Icon(ft.Icons.IMAGE_NOT_SUPPORTED_OUTLINED, color=ft.Colors.GREY_600, size=48)
+        return ft.Image(
+            src=str(path),
+            fit=ft.ImageFit.CONTAIN,
+            gapless_playback=True,
+            error_content=ft.Icon(ft.Icons.BROKEN_IMAGE_OUTLINED, color=ft.Colors.GREY_600, size=48),
+        )
+
+    def _placeholder(self):
+        return ft.Icon(ft.Icons.IMAGE_OUTLINED, color=ft.Colors.GREY_800, size=48)
+
+    def _update_window(self, first, last):
+        """Картинки - плиткам в [first, last) с запасом; дальние сверх лимита получают заглушку."""
+        self._visible = (first, last)
+        columns, _ = self._layout()
+        lo = max(0, first - WINDOW_MARGIN_ROWS * columns)
+        hi = min(len(self._holders), last + WINDOW_MARGIN_ROWS * columns)
+        for index in range(lo, hi):
+            if index in self._live:
+                self._live.move_to_end(index)
+            else:
+                self._holders[index].content = self._thumbnail(self._cards[index])
+                self._live[index] = True
+        # Вытесняем самые давно видимые, но не из текущего окна
+        for index in list(self._live):
+            if len(self._live) <= self.max_live:
+                break
+            if not lo <= index < hi:
+                self._holders[index].content = self._placeholder()
+                del self._live[index]
+
+    def _layout(self):
+        """-> (колонок, шаг ряда в пикселях) - та же раскладка, что у GridView с max_extent."""
+        width = max(1, (self.page.width or TILE_SIZE) - 2 * SPACING)
+        columns = max(1, math.ceil(width / (self.grid.max_extent + SPACING)))
+        tile_width = (width - (columns - 1) * SPACING) / columns
+        return columns, tile_width / self.grid.child_aspect_ratio + SPACING
+
+    def _on_scroll(self, e):
+        with self._lock:
+            columns, row_height = self._layout()
+            # Сверху у сетки отступ padding: первый ряд начинается не с нуля
+            top = max(0.0, e.pixels - SPACING)
+            first = int(top // row_height) * columns
+            last = math.ceil((top + e.viewport_dimension) / row_height) * columns
+            grow = e.pixels >= e.max_scroll_extent - 2 * row_height and len(self.grid.controls) < len(self._cards)
+            if grow:
+                self._append_page()
+            if grow or (first, last) != self._visible:
+                self._update_window(first, last)
+                self.grid.update()
+
+    def _play(self, card):
+        path = self.manifest.audio_path(card)
+        if path is not None:
+            # Промах кеша читает файл с диска: не в обработчике нажатия
+            self.tasks.run(lambda task: self.audio.play(path))
+
+    def stats(self):
+        with self._lock:
+            return {"cards": len(self._cards), "tiles": len(self.grid.controls), "live_thumbnails": len(self._live)}
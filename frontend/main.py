@@ -1,7 +1,18 @@
+import logging
+import os
 import flet as ft
-import requests
 import time
-import threading 
+from api_client import RETRY_CONNECT, ApiClient
+from tasks import TaskRunner
+from router import SceneRouter
+from audio_cache import AudioCache
+from card_board import CardBoard
+from session import SESSION_INVALID, SESSION_OFFLINE, check_session, token_looks_valid
+
+logging.basicConfig(level=os.getenv("EMSANA_LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(message)s")
+
+# Один клиент на все экраны: соединение с бэкендом переиспользуется
+api = ApiClient()
 
 def main(page: ft.Page):
     page.title = "EmSana"
@@ -11,6 +22,12 @@ def main(page: ft.Page):
     page.bgcolor = "#FFFFFF"
     page.padding = 0
 
+    # Сеть - только в фоне: обработчики событий сразу возвращают управление
+    tasks = TaskRunner(page)
+    # Экраны строятся один раз; при переходе незавершенные запросы прежнего экрана отменяются
+    router = SceneRouter(page, on_navigate=tasks.cancel_all)
+    board = CardBoard(page, tasks, AudioCache(page))
+
     is_login = ft.Ref[bool]()
     is_login.current = False 
 
@@ -61,6 +78,10 @@ def main(page: ft.Page):
         page.client_storage.remove("parent_name")
         page.client_storage.remove("child_name")
 
+    def fetch_json(method, path, **kwargs):
+        res = api.request(method, path, **kwargs)
+        return res.status_code, res.json()
+
     def lock_auth_ui(locked: bool):
         email_input.disabled = locked
         password_input.disabled = locked
@@ -70,63 +91,65 @@ def main(page: ft.Page):
         page.update()
 
     def check_session_on_startup():
-        page.clean()
-        page.add(
-            ft.ProgressRing(color=ft.Colors.BLUE_400),
-            ft.Container(height=10),
-            ft.Text("Проверка безопасности...", color=ft.Colors.GREY_400)
+        # Экран открывается сразу по сохраненным данным; бэкенд спрашиваем уже в фоне
+        saved_token = page.client_storage.get("access_token")
+        if not token_looks_valid(saved_token):
+            wipe_data()
+            show_auth_scene()
+            return
+
+        if page.client_storage.contains_key("parent_pin"):
+            show_main_scene()
+        else:
+            show_onboarding_scene()
+
+        def on_checked(result):
+            if result == SESSION_OFFLINE:
+                # Сеть или сервер недоступны - это не повод разлогинивать
+                print("Сервер недоступен, работаем по сохраненной сессии")
+            elif result == SESSION_INVALID and page.client_storage.get("access_token") == saved_token:
+                wipe_data()
+                show_auth_scene()
+                status_text.value = "Сессия истекла. Войдите снова."
+                status_text.color = ft.Colors.RED
+
+        # Не привязана к экрану: ребенок может уйти в свое пространство, пока идет проверка
+        tasks.run(lambda task: check_session(api, saved_token), on_done=on_checked, scoped=False)
+
+    def profile_names():
+        return (
+            page.client_storage.get("parent_name") or "Родитель",
+            page.client_storage.get("child_name") or "Ребенок",
         )
-        page.update()
 
-        saved_token = page.client_storage.get("access_token")
-        
-        if saved_token:
-            try:
-                res = requests.post("http://127.0.0.1:8000/verify-session", json={"access_token": saved_token})
-                if res.status_code == 200 and res.json().get("valid") == True:
-                    if page.client_storage.contains_key("parent_pin"):
-                        show_main_scene()
-                    else:
-                        show_onboarding_scene()
-                    return
-                else:
-                    wipe_data() 
-            except Exception as e:
-                print("Бэкенд недоступен:", e)
-        
+    # --- Онбординг ---
+    parent_name_input = ft.TextField(label="Ваше имя (Родитель)", width=250, text_align=ft.TextAlign.CENTER)
+    child_name_input = ft.TextField(label="Имя ребенка", width=250, text_align=ft.TextAlign.CENTER)
+    new_pin_input = ft.TextField(label="Придумайте 4-значный ПИН-код", password=True, can_reveal_password=True, width=250, text_align=ft.TextAlign.CENTER, keyboard_type=ft.KeyboardType.NUMBER, max_length=4)
+    onboard_error = ft.Text("", color=ft.Colors.RED)
+
+    def cancel_onboarding(e):
         wipe_data() 
         show_auth_scene()
 
-    def show_onboarding_scene():
-        page.clean()
-        page.bgcolor = "#0B0C10"
+    def save_onboarding_data(e):
+        if not parent_name_input.value or not child_name_input.value:
+            onboard_error.value = "Пожалуйста, введите имена!"
+            page.update()
+            return
 
-        def cancel_onboarding(e):
-            wipe_data() 
-            show_auth_scene()
+        if len(new_pin_input.value) == 4 and new_pin_input.value.isdigit():
+            page.client_storage.set("parent_pin", new_pin_input.value) 
+            page.client_storage.set("parent_name", parent_name_input.value)
+            page.client_storage.set("child_name", child_name_input.value)
+            show_main_scene() 
+        else:
+            onboard_error.value = "ПИН-код должен состоять из 4 цифр!"
+            page.update()
 
+    def build_onboarding_scene():
         back_btn = ft.Row([ft.IconButton(ft.Icons.ARROW_BACK, icon_color=ft.Colors.WHITE, on_click=cancel_onboarding)], alignment=ft.MainAxisAlignment.START)
-        parent_name_input = ft.TextField(label="Ваше имя (Родитель)", width=250, text_align=ft.TextAlign.CENTER)
-        child_name_input = ft.TextField(label="Имя ребенка", width=250, text_align=ft.TextAlign.CENTER)
-        new_pin_input = ft.TextField(label="Придумайте 4-значный ПИН-код", password=True, can_reveal_password=True, width=250, text_align=ft.TextAlign.CENTER, keyboard_type=ft.KeyboardType.NUMBER, max_length=4)
-        onboard_error = ft.Text("", color=ft.Colors.RED)
-
-        def save_onboarding_data(e):
-            if not parent_name_input.value or not child_name_input.value:
-                onboard_error.value = "Пожалуйста, введите имена!"
-                page.update()
-                return
-
-            if len(new_pin_input.value) == 4 and new_pin_input.value.isdigit():
-                page.client_storage.set("parent_pin", new_pin_input.value) 
-                page.client_storage.set("parent_name", parent_name_input.value)
-                page.client_storage.set("child_name", child_name_input.value)
-                show_main_scene() 
-            else:
-                onboard_error.value = "ПИН-код должен состоять из 4 цифр!"
-                page.update()
-
-        page.add(
+        return [
             back_btn,
             ft.Container(height=10),
             ft.Row([ft.Icon(ft.Icons.ROCKET_LAUNCH, size=50, color=ft.Colors.BLUE_400)], alignment=ft.MainAxisAlignment.CENTER),
@@ -139,89 +162,129 @@ def main(page: ft.Page):
             ft.Row([onboard_error], alignment=ft.MainAxisAlignment.CENTER),
             ft.Container(height=10),
             ft.Row([ft.ElevatedButton("Сохранить и начать", bgcolor=ft.Colors.BLUE_700, color=ft.Colors.WHITE, on_click=save_onboarding_data)], alignment=ft.MainAxisAlignment.CENTER)
-        )
-        page.update()
-
-    def show_main_scene():
-        page.clean()
-        page.bgcolor = "#0B0C10"
-
-        p_name = page.client_storage.get("parent_name") or "Родитель"
-        c_name = page.client_storage.get("child_name") or "Ребенок"
-
-        def go_to_child_space(e):
-            page.clean()
-            page.add(
-                ft.Text(f"🚀 Космос ({c_name})", size=30, color=ft.Colors.WHITE),
-                ft.ElevatedButton("Выйти в меню", on_click=lambda _: show_main_scene())
-            )
-            page.update()
+        ]
 
-        def go_to_parent_dashboard():
-            page.clean()
-
-            def logout(e):
-                page.client_storage.remove("access_token") 
-                show_auth_scene()
+    def reset_onboarding():
+        parent_name_input.value = ""
+        child_name_input.value = ""
+        new_pin_input.value = ""
+        onboard_error.value = ""
 
-            page.add(
-                ft.Text(f"📊 Панель управления ({p_name})", size=30, color=ft.Colors.WHITE),
-                ft.Container(height=20),
-                ft.ElevatedButton("Назад к профилям", on_click=lambda _: show_main_scene()),
-                ft.ElevatedButton("Выйти из аккаунта", bgcolor=ft.Colors.RED_700, color=ft.Colors.WHITE, on_click=logout)
-            )
-            page.update()
+    def show_onboarding_scene():
+        router.show("onboarding", build_onboarding_scene, bgcolor="#0B0C10", on_show=reset_onboarding)
 
-        # ИСПРАВЛЕННЫЙ УЧАСТОК КОДА (С ограничением в 4 символа)
-        pin_input = ft.TextField(
-            label="Введите ПИН-код", password=True, can_reveal_password=True, 
-            width=200, text_align=ft.TextAlign.CENTER, keyboard_type=ft.KeyboardType.NUMBER,
-            max_length=4
-        )
-        pin_error = ft.Text("", color=ft.Colors.RED)
-
-        def check_pin(e):
-            if pin_input.value == page.client_storage.get("parent_pin"): 
-                go_to_parent_dashboard()
-            else:
-                pin_error.value = "Неверный ПИН-код!"
-                pin_input.value = ""
-                page.update()
-
-        def show_pin_dialog(e):
-            page.clean()
-            page.add(
-                ft.Container(height=80),
-                ft.Row([ft.Icon(ft.Icons.LOCK, size=50, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER),
-                ft.Row([ft.Text(f"Доступ для {p_name}", size=25, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER),
-                ft.Container(height=20),
-                ft.Row([pin_input], alignment=ft.MainAxisAlignment.CENTER),
-                ft.Row([pin_error], alignment=ft.MainAxisAlignment.CENTER),
-                ft.Container(height=20),
-                ft.Row([
-                    ft.ElevatedButton("Отмена", on_click=lambda _: show_main_scene()),
-                    ft.ElevatedButton("Войти", bgcolor=ft.Colors.BLUE_700, color=ft.Colors.WHITE, on_click=check_pin)
-                ], alignment=ft.MainAxisAlignment.CENTER, spacing=20)
-            )
-            page.update()
+    # --- Выбор профиля ---
+    parent_name_text = ft.Text("", size=20, color=ft.Colors.WHITE)
+    child_name_text = ft.Text("", size=20, color=ft.Colors.WHITE)
 
+    def build_main_scene():
         parent_card = ft.Container(
-            content=ft.Column([ft.Icon(ft.Icons.PERSON, size=80, color=ft.Colors.WHITE), ft.Text(p_name, size=20, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+            content=ft.Column([ft.Icon(ft.Icons.PERSON, size=80, color=ft.Colors.WHITE), parent_name_text], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
             width=200, height=250, border_radius=20, border=ft.border.all(1, ft.Colors.GREY_400), ink=True, on_click=show_pin_dialog 
         )
 
         child_card = ft.Container(
-            content=ft.Column([ft.Icon(ft.Icons.ROCKET_LAUNCH, size=80, color=ft.Colors.WHITE), ft.Text(c_name, size=20, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+            content=ft.Column([ft.Icon(ft.Icons.ROCKET_LAUNCH, size=80, color=ft.Colors.WHITE), child_name_text], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
             width=200, height=250, border_radius=20, border=ft.border.all(1, ft.Colors.GREY_400), ink=True, on_click=go_to_child_space
         )
 
-        page.add(
+        return [
             ft.Container(height=50),
             ft.Row([ft.Text("Кто сейчас пользуется EmSana?", size=30, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER),
             ft.Container(height=40),
             ft.Row([parent_card, child_card], alignment=ft.MainAxisAlignment.CENTER, spacing=50)
-        )
-        page.update()
+        ]
+
+    def refresh_main_scene():
+        parent_name_text.value, child_name_text.value = profile_names()
+
+    def show_main_scene():
+        router.show("main", build_main_scene, bgcolor="#0B0C10", on_show=refresh_main_scene)
+
+    # --- Пространство ребенка ---
+    child_space_title = ft.Text("", size=30, color=ft.Colors.WHITE)
+
+    def build_child_space():
+        return [
+            ft.Row([
+                child_space_title,
+                ft.ElevatedButton("Выйти в меню", on_click=lambda _: show_main_scene())
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            board.view
+        ]
+
+    def refresh_child_space():
+        child_space_title.value = f"🚀 Космос ({profile_names()[1]})"
+        board.open()
+
+    def go_to_child_space(e):
+        router.show("child", build_child_space, bgcolor="#0B0C10", on_show=refresh_child_space)
+
+    # --- Панель родителя ---
+    dashboard_title = ft.Text("", size=30, color=ft.Colors.WHITE)
+
+    def logout(e):
+        token = page.client_storage.get("access_token")
+        if token:
+            # Сервер забывает сессию в фоне; выходим, не дожидаясь ответа
+            tasks.run(lambda task: api.post("/logout", json={"access_token": token}, timeout=3))
+        page.client_storage.remove("access_token") 
+        show_auth_scene()
+
+    def build_parent_dashboard():
+        return [
+            dashboard_title,
+            ft.Container(height=20),
+            ft.ElevatedButton("Назад к профилям", on_click=lambda _: show_main_scene()),
+            ft.ElevatedButton("Выйти из аккаунта", bgcolor=ft.Colors.RED_700, color=ft.Colors.WHITE, on_click=logout)
+        ]
+
+    def refresh_parent_dashboard():
+        dashboard_title.value = f"📊 Панель управления ({profile_names()[0]})"
+
+    def go_to_parent_dashboard():
+        router.show("dashboard", build_parent_dashboard, bgcolor="#0B0C10", on_show=refresh_parent_dashboard)
+
+    # --- ПИН-код родителя ---
+    # ИСПРАВЛЕННЫЙ УЧАСТОК КОДА (С ограничением в 4 символа)
+    pin_input = ft.TextField(
+        label="Введите ПИН-код", password=True, can_reveal_password=True, 
+        width=200, text_align=ft.TextAlign.CENTER, keyboard_type=ft.KeyboardType.NUMBER,
+        max_length=4
+    )
+    pin_error = ft.Text("", color=ft.Colors.RED)
+    pin_title = ft.Text("", size=25, color=ft.Colors.WHITE)
+
+    def check_pin(e):
+        if pin_input.value == page.client_storage.get("parent_pin"): 
+            go_to_parent_dashboard()
+        else:
+            pin_error.value = "Неверный ПИН-код!"
+            pin_input.value = ""
+            page.update()
+
+    def build_pin_dialog():
+        return [
+            ft.Container(height=80),
+            ft.Row([ft.Icon(ft.Icons.LOCK, size=50, color=ft.Colors.WHITE)], alignment=ft.MainAxisAlignment.CENTER),
+            ft.Row([pin_title], alignment=ft.MainAxisAlignment.CENTER),
+            ft.Container(height=20),
+            ft.Row([pin_input], alignment=ft.MainAxisAlignment.CENTER),
+            ft.Row([pin_error], alignment=ft.MainAxisAlignment.CENTER),
+            ft.Container(height=20),
+            ft.Row([
+                ft.ElevatedButton("Отмена", on_click=lambda _: show_main_scene()),
+                ft.ElevatedButton("Войти", bgcolor=ft.Colors.BLUE_700, color=ft.Colors.WHITE, on_click=check_pin)
+            ], alignment=ft.MainAxisAlignment.CENTER, spacing=20)
+        ]
+
+    def reset_pin_dialog():
+        pin_title.value = f"Доступ для {profile_names()[0]}"
+        pin_input.value = ""
+        pin_error.value = ""
+
+    def show_pin_dialog(e):
+        router.show("pin", build_pin_dialog, bgcolor="#0B0C10", on_show=reset_pin_dialog)
 
     def execute_login(access_token):
         if access_token:
@@ -231,48 +294,65 @@ def main(page: ft.Page):
         else:
             show_onboarding_scene() 
 
+    def wait_google_login(task, state):
+        """-> access_token или None: long-poll /check-google, пока попытка не завершится."""
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and not task.cancelled:
+            try:
+                # Long-poll: сервер держит запрос, пока вход не завершится (до wait секунд)
+                wait = max(1, min(25, int(deadline - time.monotonic())))
+                _, data = fetch_json(
+                    "GET",
+                    "/check-google",
+                    params={"state": state, "wait": wait},
+                    timeout=(3.05, wait + 5),
+                    retry=False,
+                )
+                if data.get("status") == "success":
+                    return data.get("access_token")
+                if data.get("status") == "expired":
+                    return None
+            except Exception as err: 
+                print(f"Ошибка шпиона: {err}")
+                # Сервер недоступен: не долбим его без паузы
+                time.sleep(1)
+        return None
+
     def auth_google(e):
         lock_auth_ui(True) 
         status_text.value = "🚀 Запуск авторизации..."
         status_text.color = ft.Colors.BLUE_400
         page.update()
-        try:
-            res = requests.get("http://127.0.0.1:8000/auth/google")
-            if res.status_code == 200:
-                page.launch_url(res.json().get("url")) 
-                status_text.value = "⏳ Ожидание входа в браузере..."
-                page.update()
-
-                def check_login():
-                    success = False
-                    for i in range(60): 
-                        time.sleep(1)
-                        try:
-                            check_res = requests.get("http://127.0.0.1:8000/check-google")
-                            data = check_res.json()
-                            if data.get("status") == "success":
-                                execute_login(data.get("access_token")) 
-                                success = True
-                                break
-                        except Exception as err: 
-                            print(f"Ошибка шпиона: {err}")
-                    
-                    if not success:
-                        status_text.value = "Время ожидания истекло. Попробуйте еще раз."
-                        status_text.color = ft.Colors.RED
-                        lock_auth_ui(False)
-
-                threading.Thread(target=check_login, daemon=True).start()
+
+        def on_finished(access_token):
+            if access_token:
+                execute_login(access_token)
             else:
+                status_text.value = "Время ожидания истекло. Попробуйте еще раз."
+                status_text.color = ft.Colors.RED
+                lock_auth_ui(False)
+
+        def on_started(result):
+            status_code, data = result
+            if status_code != 200:
                 status_text.value = "Ошибка сервера"
                 status_text.color = ft.Colors.RED
                 lock_auth_ui(False)
-        except Exception as ex:
+                return
+            # У каждой попытки входа свой state: по нему спрашиваем именно свой результат
+            state = data.get("state")
+            page.launch_url(data.get("url")) 
+            status_text.value = "⏳ Ожидание входа в браузере..."
+            tasks.run(lambda task: wait_google_login(task, state), on_done=on_finished)
+
+        def on_failed(ex):
             print(f"ОШИБКА: {ex}")
             status_text.value = "Ошибка соединения (Проверь uvicorn!)"
             status_text.color = ft.Colors.RED
             lock_auth_ui(False)
 
+        tasks.run(lambda task: fetch_json("GET", "/auth/google", retry=RETRY_CONNECT), on_done=on_started, on_error=on_failed)
+
     def handle_auth(e):
         if not email_input.value or not password_input.value:
             status_text.value = "Пожалуйста, введите Email и Пароль!"
@@ -282,21 +362,18 @@ def main(page: ft.Page):
 
         lock_auth_ui(True) 
         endpoint = "/login" if is_login.current else "/register"
+        payload = {"email": email_input.value, "password": password_input.value}
         status_text.value = "Загрузка..."
         status_text.color = ft.Colors.WHITE
         page.update()
-        try:
-            res = requests.post(
-                f"http://127.0.0.1:8000{endpoint}",
-                json={"email": email_input.value, "password": password_input.value}
-            )
-            data = res.json()
-            if res.status_code == 200:
+
+        def on_finished(result):
+            status_code, data = result
+            if status_code == 200:
                 if endpoint == "/login":
                     execute_login(data.get("access_token")) 
                 else:
                     show_email_confirmation_pending_scene()
-                    return
             else:
                 raw_error = data.get('detail')
                 error_dict = {
@@ -308,12 +385,15 @@ def main(page: ft.Page):
                 status_text.value = f"Ошибка: {error_dict.get(raw_error, raw_error)}"
                 status_text.color = ft.Colors.RED
                 lock_auth_ui(False)
-        except Exception as ex: 
+
+        def on_failed(ex):
             print(f"ОШИБКА: {ex}")
             status_text.value = "Ошибка: сервер не отвечает"
             status_text.color = ft.Colors.RED
             lock_auth_ui(False)
 
+        tasks.run(lambda task: fetch_json("POST", endpoint, json=payload), on_done=on_finished, on_error=on_failed)
+
     def toggle_mode(e):
         is_login.current = not is_login.current
         show_auth_scene()
@@ -373,44 +453,49 @@ def main(page: ft.Page):
         ),
     )
 
-    def show_forgot_password_scene():
-        page.clean()
-        page.bgcolor = "#FFFFFF"
-
-        fp_email = ft.TextField(
-            label="EMAIL",
-            label_style=ft.TextStyle(size=11, weight=ft.FontWeight.W_500, color="#999999", letter_spacing=1.5),
-            width=340,
-            height=55,
-            border=ft.InputBorder.UNDERLINE,
-            border_color="#E0E0E0",
-            focused_border_color="#000000",
-            cursor_color="#000000",
-            color="#000000",
-            text_size=15,
-            content_padding=ft.padding.only(left=0, top=20, bottom=8),
-        )
-        fp_status = ft.Text("", size=13)
+    # --- Сброс пароля ---
+    fp_email = ft.TextField(
+        label="EMAIL",
+        label_style=ft.TextStyle(size=11, weight=ft.FontWeight.W_500, color="#999999", letter_spacing=1.5),
+        width=340,
+        height=55,
+        border=ft.InputBorder.UNDERLINE,
+        border_color="#E0E0E0",
+        focused_border_color="#000000",
+        cursor_color="#000000",
+        color="#000000",
+        text_size=15,
+        content_padding=ft.padding.only(left=0, top=20, bottom=8),
+    )
+    fp_status = ft.Text("", size=13)
 
-        def send_reset(e):
-            if not fp_email.value:
-                fp_status.value = "Please enter your email."
-                fp_status.color = "#D32F2F"
-                page.update()
-                return
-            try:
-                res = requests.post(
-                    "http://127.0.0.1:8000/forgot-password",
-                    json={"email": fp_email.value},
-                )
-                fp_status.value = "If that email exists, a reset link has been sent."
-                fp_status.color = "#4CAF50"
-            except Exception:
-                fp_status.value = "Server is unreachable."
-                fp_status.color = "#D32F2F"
+    def send_reset(e):
+        if not fp_email.value:
+            fp_status.value = "Please enter your email."
+            fp_status.color = "#D32F2F"
             page.update()
+            return
+        fp_status.value = "Sending..."
+        fp_status.color = "#999999"
+        page.update()
 
-        page.add(
+        def on_sent(res):
+            fp_status.value = "If that email exists, a reset link has been sent."
+            fp_status.color = "#4CAF50"
+
+        def on_failed(ex):
+            fp_status.value = "Server is unreachable."
+            fp_status.color = "#D32F2F"
+
+        email = fp_email.value
+        tasks.run(
+            lambda task: api.post("/forgot-password", json={"email": email}, retry=RETRY_CONNECT),
+            on_done=on_sent,
+            on_error=on_failed,
+        )
+
+    def build_forgot_password_scene():
+        return [
             ft.Container(
                 content=ft.Column(
                     [
@@ -453,14 +538,18 @@ def main(page: ft.Page):
                 padding=ft.padding.symmetric(horizontal=40),
                 expand=True,
             )
-        )
-        page.update()
+        ]
 
-    def show_email_confirmation_pending_scene():
-        page.clean()
-        page.bgcolor = "#FFFFFF"
+    def reset_forgot_password_scene():
+        fp_email.value = ""
+        fp_status.value = ""
+
+    def show_forgot_password_scene():
+        router.show("forgot", build_forgot_password_scene, bgcolor="#FFFFFF", on_show=reset_forgot_password_scene)
 
-        page.add(
+    # --- Ожидание подтверждения email ---
+    def build_email_confirmation_pending_scene():
+        return [
             ft.Container(
                 content=ft.Column(
                     [
@@ -488,28 +577,14 @@ def main(page: ft.Page):
                 padding=ft.padding.symmetric(horizontal=40),
                 expand=True,
             )
-        )
-        page.update()
-
-    def show_auth_scene():
-        email_input.value = ""
-        password_input.value = ""
-        status_text.value = ""
-        lock_auth_ui(False)
+        ]
 
-        # Update button/title text based on mode
-        if is_login.current:
-            title_text.value = "Sign in to EmSana"
-            main_btn.text = "Log in"
-            toggle_btn.text = "No account? Create one"
-        else:
-            title_text.value = "Create an account"
-            main_btn.text = "Create account"
-            toggle_btn.text = "Already have an account? Log in"
+    def show_email_confirmation_pending_scene():
+        router.show("email_pending", build_email_confirmation_pending_scene, bgcolor="#FFFFFF")
 
-        page.clean()
-        page.bgcolor = "#FFFFFF"
-        page.add(
+    # --- Вход и регистрация ---
+    def build_auth_scene():
+        return [
             ft.Container(
                 content=ft.Column(
                     [
@@ -542,7 +617,7 @@ def main(page: ft.Page):
                         ft.Container(height=20),
                         main_btn,
                         ft.Container(height=12),
-                        forgot_password_btn if is_login.current else ft.Container(),
+                        forgot_password_btn,
                         toggle_btn,
                         ft.Container(height=8),
                         status_text,
@@ -554,9 +629,28 @@ def main(page: ft.Page):
                 padding=ft.padding.symmetric(horizontal=40),
                 expand=True,
             )
-        )
-        page.update()
+        ]
+
+    def reset_auth_scene():
+        email_input.value = ""
+        password_input.value = ""
+        status_text.value = ""
+        lock_auth_ui(False)
+
+        # Update button/title text based on mode
+        if is_login.current:
+            title_text.value = "Sign in to EmSana"
+            main_btn.text = "Log in"
+            toggle_btn.text = "No account? Create one"
+        else:
+            title_text.value = "Create an account"
+            main_btn.text = "Create account"
+            toggle_btn.text = "Already have an account? Log in"
+        forgot_password_btn.visible = is_login.current
+
+    def show_auth_scene():
+        router.show("auth", build_auth_scene, bgcolor="#FFFFFF", on_show=reset_auth_scene)
 
     check_session_on_startup()
 
-ft.app(target=main)
\ No newline at end of file
+ft.app(target=main)
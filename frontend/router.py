@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import OrderedDict
+
+import flet as ft
+
+# Сколько построенных экранов держим на странице; лишние выбрасываются, начиная с давних
+MAX_CACHED_SCENES = 8
+
+log = logging.getLogger("emsana.router")
+
+
+def count_controls(control):
+    """Размер дерева в контролах: столько объектов уходит клиенту при первой отправке."""
+    children = control._get_children() if hasattr(control, "_get_children") else []
+    return 1 + sum(count_controls(child) for child in children if child is not None)
+
+
+class SceneRouter:
+    """Переключает экраны видимостью, а не page.clean() и сборкой заново.
+
+    Каждый экран строится один раз при первом показе и остается на
+    странице скрытым; переход - смена visible у двух корней, и Flet
+    отправляет клиенту только эти изменения. on_show экрана обновляет
+    его изменчивые поля перед показом. Для каждого перехода в
+    self.history пишется (экран, построен ли заново, сколько контролов
+    отправлено целиком, мс); Flet не отдает размер сообщений в байтах,
+    так что объем измеряется в контролах.
+    """
+
+    def __init__(self, page, max_scenes=MAX_CACHED_SCENES, on_navigate=None):
+        self.page = page
+        self.max_scenes = max_scenes
+        self.on_navigate = on_navigate
+        self.current = None
+        self.history = []
+        self._scenes = OrderedDict()
+
+    def show(self, name, build, bgcolor=None, on_show=None):
+        """build() -> список контролов экрана (как для page.add); вызывается только при первом показе."""
+        start = time.perf_counter()
+        if self.on_navigate:
+            self.on_navigate()
+
+        scene = self._scenes.get(name)
+        shipped = 0
+        if scene is None:
+            root = ft.Column(
+                build(),
+                alignment=ft.MainAxisAlignment.CENTER,
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                expand=True,
+                visible=False,
+            )
+            scene = self._scenes[name] = (root, bgcolor)
+            self.page.controls.append(root)
+            shipped = count_controls(root)
+        self._scenes.move_to_end(name)
+
+        if on_show:
+            on_show()
+        for other, (root, _) in self._scenes.items():
+            root.visible = other == name
+        if scene[1]:
+            self.page.bgcolor = scene[1]
+        self.current = name
+        self._evict()
+        self.page.update()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.history.append((name, bool(shipped), shipped, elapsed))
+        log.info("scene %s: %s, %d controls sent, %.1f ms", name, "built" if shipped else "cached", shipped, elapsed)
+
+    def _evict(self):
+        for name in list(self._scenes):
+            if len(self._scenes) <= self.max_scenes:
+                break
+            if name != self.current:
+                root, _ = self._scenes.pop(name)
+                self.page.controls.remove(root)
@@ -0,0 +1,44 @@
+import base64
+import json
+import time
+
+import requests
+
+SESSION_VALID = "valid"
+SESSION_INVALID = "invalid"
+SESSION_OFFLINE = "offline"
+# Токен, которому осталось жить меньше, считаем уже истекшим: часы устройства могут спешить
+EXPIRY_LEEWAY = 30
+
+
+def token_expiry(token):
+    """exp из тела JWT без проверки подписи (ее проверяет бэкенд); None для мусора."""
+    try:
+        body = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        return int(claims["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def token_looks_valid(token, now=None):
+    """Можно ли сразу пускать в приложение, не дожидаясь бэкенда."""
+    exp = token_expiry(token) if token else None
+    return exp is not None and exp > (now or time.time()) + EXPIRY_LEEWAY
+
+
+def check_session(api, token):
+    """Проверка токена на бэкенде -> SESSION_VALID / SESSION_INVALID / SESSION_OFFLINE.
+
+    OFFLINE - ответить сейчас некому (нет сети, бэкенд или Supabase
+    недоступны): сессию в этом случае не трогаем.
+    """
+    try:
+        res = api.post("/verify-session", json={"access_token": token}, retry=True)
+    except (requests.ConnectionError, requests.Timeout):
+        return SESSION_OFFLINE
+    if res.status_code >= 500:
+        return SESSION_OFFLINE
+    if res.status_code == 200 and res.json().get("valid") == True:
+        return SESSION_VALID
+    return SESSION_INVALID
@@ -0,0 +1,73 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("emsana.tasks")
+
+
+class Task:
+    """Ручка фоновой задачи: долгие циклы проверяют task.cancelled между шагами."""
+
+    def __init__(self, runner, scope):
+        self._runner = runner
+        self._scope = scope
+
+    @property
+    def cancelled(self):
+        return self._scope is not None and self._runner.scope != self._scope
+
+
+class TaskRunner:
+    """Выполняет блокирующую работу (сеть) вне обработчиков событий Flet.
+
+    Обработчик сразу рисует состояние загрузки и отдает работу сюда;
+    результат возвращается в on_done/on_error, после чего страница
+    обновляется. Колбэки выполняются по одному, под общим замком.
+
+    cancel_all() вызывается при смене экрана: результаты задач, начатых
+    на прежнем экране, молча отбрасываются.
+    """
+
+    def __init__(self, page, max_workers=4):
+        self.page = page
+        self.scope = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="emsana-io")
+        self._ui_lock = threading.RLock()
+
+    def cancel_all(self):
+        with self._ui_lock:
+            self.scope += 1
+
+    def run(self, work, on_done=None, on_error=None, scoped=True):
+        """work(task) выполняется в пуле; on_done(result) / on_error(exc) - с обновлением страницы.
+
+        scoped=False - задача не привязана к экрану и не отменяется при
+        смене экрана (например, фоновая перепроверка сессии).
+        """
+        task = Task(self, self.scope if scoped else None)
+
+        def deliver(callback, value):
+            if callback is None:
+                return
+            with self._ui_lock:
+                if task.cancelled:
+                    return
+                callback(value)
+                self.page.update()
+
+        def job():
+            try:
+                result = work(task)
+            except Exception as e:
+                if on_error is None:
+                    log.warning("background task failed: %s", e)
+                deliver(on_error, e)
+            else:
+                deliver(on_done, result)
+
+        self._executor.submit(job)
+        return task
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
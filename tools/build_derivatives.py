@@ -0,0 +1,175 @@
+"""Сборка уменьшенных копий картинок карточек: лестница размеров в WebP/AVIF/JPEG.
+
+Обходит assets/Коммуникация и assets/world_of_things, для каждой картинки
+строит ширины из --widths (без увеличения) во всех доступных форматах и
+пишет их в assets/_derived/ вместе с index.json. Пересобираются только
+картинки, у которых изменилось содержимое (sha256) или параметры сборки.
+
+Запуск из корня репозитория:
+    python -m tools.build_derivatives --workers 4
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+from tools.common import (
+    ASSETS_DIR,
+    DERIVED_DIR_NAME,
+    DERIVED_INDEX_NAME as INDEX_NAME,
+    DERIVED_INDEX_VERSION as INDEX_VERSION,
+    IMAGE_EXTENSIONS,
+    SOURCE_DIRS,
+    file_hash,
+    load_derived_index as load_index,
+)
+
+DEFAULT_WIDTHS = (160, 320, 640, 1280)
+# Качество подобрано на глаз для фотографий карточек
+QUALITY = {"avif": 50, "webp": 78, "jpeg": 82}
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG"}
+EXTENSIONS = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg"}
+# Файлы, которые пишет build_one (и его недописанные .tmp); остальное в _derived/
+# (например, звуки tools.normalize_audio) сборке картинок не принадлежит
+OWNED_PATTERN = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{16}_\d+\.(avif|webp|jpg)(\.\d+\.tmp)?$")
+
+
+def available_formats():
+    # AVIF есть в Pillow >= 11.2 (или через pillow-avif-plugin) не везде
+    formats = ["webp", "jpeg"]
+    if features.check("avif") or ".avif" in Image.registered_extensions():
+        formats.insert(0, "avif")
+    return formats
+
+
+def find_sources(assets_dir):
+    sources = []
+    for name in SOURCE_DIRS:
+        for path in sorted((assets_dir / name).rglob("*")):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                sources.append(path)
+    return sources
+
+
+def ladder(width, widths):
+    """Ширины, в которые имеет смысл уменьшать картинку шириной width."""
+    steps = [w for w in widths if w < width]
+    # Самая крупная ступень - не больше оригинала
+    if not steps or width <= max(widths):
+        steps.append(width)
+    return sorted(set(steps))
+
+
+def build_one(job):
+    """Строит все копии одной картинки. Выполняется в процессе пула."""
+    source, digest, out_dir, widths, formats = job
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        src_w, src_h = img.size
+        variants = []
+        for width in ladder(src_w, widths):
+            height = max(1, round(src_h * width / src_w))
+            resized = img if width == src_w else img.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                frame = resized.convert("RGB") if fmt == "jpeg" else resized
+                name = f"{digest[:2]}/{digest[:16]}_{width}{EXTENSIONS[fmt]}"
+                target = Path(out_dir) / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # Одинаковые картинки дают одинаковые имена: временный файл свой у каждого процесса
+                tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                options = {"quality": QUALITY[fmt]}
+                if fmt == "jpeg":
+                    options.update(optimize=True, progressive=True)
+                elif fmt == "webp":
+                    options["method"] = 6
+                frame.save(tmp, PIL_FORMATS[fmt], **options)
+                os.replace(tmp, target)
+                variants.append({
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "path": name,
+                    "bytes": target.stat().st_size,
+                    "hash": file_hash(target),
+                })
+    return {"hash": digest, "width": src_w, "height": src_h, "variants": variants}
+
+
+def is_fresh(entry, digest, out_dir):
+    return (
+        entry is not None
+        and entry["hash"] == digest
+        and all((out_dir / v["path"]).exists() for v in entry["variants"])
+    )
+
+
+def sweep_stale(out_dir, keep):
+    """Удаляет копии картинок, которых нет в keep; чужие файлы в out_dir не трогает."""
+    for path in out_dir.glob("*/*"):
+        rel = path.relative_to(out_dir).as_posix()
+        if path.is_file() and OWNED_PATTERN.match(rel) and rel not in keep:
+            path.unlink()
+
+
+def build(assets_dir=ASSETS_DIR, widths=DEFAULT_WIDTHS, formats=None, workers=None, force=False):
+    """-> (index, сколько картинок пересобрано)."""
+    formats = list(formats or available_formats())
+    out_dir = assets_dir / DERIVED_DIR_NAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    params = {"widths": sorted(widths), "formats": formats, "quality": {f: QUALITY[f] for f in formats}}
+
+    old = load_index(out_dir / INDEX_NAME)
+    old_sources = old["sources"] if old and old.get("params") == params and not force else {}
+
+    sources, jobs = {}, []
+    for path in find_sources(assets_dir):
+        rel = path.relative_to(assets_dir).as_posix()
+        digest = file_hash(path)
+        entry = old_sources.get(rel)
+        if is_fresh(entry, digest, out_dir):
+            sources[rel] = entry
+        else:
+            jobs.append((rel, (str(path), digest, str(out_dir), params["widths"], formats)))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (rel, _), entry in zip(jobs, pool.map(build_one, [job for _, job in jobs])):
+                sources[rel] = entry
+
+    # Копии картинок, которых больше нет (или со старыми параметрами), удаляем
+    sweep_stale(out_dir, {v["path"] for entry in sources.values() for v in entry["variants"]})
+
+    index = {"version": INDEX_VERSION, "params": params, "sources": dict(sorted(sources.items()))}
+    tmp = out_dir / (INDEX_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, out_dir / INDEX_NAME)
+    return index, len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=Path, default=ASSETS_DIR)
+    parser.add_argument("--widths", type=int, nargs="+", default=list(DEFAULT_WIDTHS))
+    parser.add_argument("--formats", nargs="+", choices=sorted(PIL_FORMATS), help="по умолчанию - все доступные")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле (по умолчанию - по числу ядер)")
+    parser.add_argument("--force", action="store_true", help="пересобрать все, не глядя на index.json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, rebuilt = build(args.assets, args.widths, args.formats, args.workers, args.force)
+    original = sum((args.assets / rel).stat().st_size for rel in index["sources"])
+    smallest = sum(min(v["bytes"] for v in entry["variants"]) for entry in index["sources"].values())
+    print(f"{len(index['sources'])} картинок, пересобрано {rebuilt} за {time.perf_counter() - start:.1f} с; "
+          f"оригиналы {original / 1e6:.1f} MB, самые мелкие копии {smallest / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Сборка assets/manifest.json - индекса всех карточек вместо обхода папок в приложении.
+
+Карточка - папка, в которой непосредственно лежат картинка и/или звуки
+(например, world_of_things/Животные /Домашние/Свинья). Для каждой
+карточки в манифест попадают категория, подпись, картинка с размерами,
+хешем и уменьшенными копиями (если собран assets/_derived/index.json,
+см. tools.build_derivatives) и звук по языкам: имя файла кириллицей - ru,
+иначе en, с нормализованными вариантами из tools.normalize_audio.
+
+Проблемы (нет картинки или звука, два звука на один язык, две
+картинки, одинаковые ID) печатаются; с --strict сборка завершается с
+ошибкой.
+
+Запуск из корня репозитория:
+    python -m tools.build_manifest --strict
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from tools.common import (
+    ASSETS_DIR,
+    AUDIO_EXTENSIONS,
+    DERIVED_DIR_NAME,
+    DERIVED_INDEX_NAME,
+    IMAGE_EXTENSIONS,
+    SOURCE_DIRS,
+    file_hash,
+    load_derived_index,
+)
+from tools.normalize_audio import AUDIO_INDEX_NAME, load_index as load_audio_index
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+CYRILLIC = re.compile("[Ѐ-ӿ]")
+LATIN = re.compile("[A-Za-z]")
+
+
+def clean(name):
+    # В дереве встречаются хвостовые пробелы ("Животные ") и разные формы Unicode
+    return unicodedata.normalize("NFC", name).strip()
+
+
+def card_id(category, label):
+    return hashlib.sha1(f"{category}/{label}".encode()).hexdigest()[:12]
+
+
+def audio_language(path):
+    return "ru" if CYRILLIC.search(path.stem) else "en"
+
+
+def media_entry(path, assets_dir):
+    return {
+        "path": path.relative_to(assets_dir).as_posix(),
+        "bytes": path.stat().st_size,
+        "hash": file_hash(path),
+    }
+
+
+def build_manifest(assets_dir=ASSETS_DIR):
+    """-> (manifest, список проблем)."""
+    derived = load_derived_index(assets_dir / DERIVED_DIR_NAME / DERIVED_INDEX_NAME) or {"sources": {}}
+    normalized = load_audio_index(assets_dir / DERIVED_DIR_NAME / AUDIO_INDEX_NAME) or {"sources": {}}
+    problems = []
+    cards, categories = {}, {}
+
+    def add_category(parts):
+        key = "/".join(parts)
+        if key not in categories:
+            categories[key] = {"label": parts[-1], "parent": "/".join(parts[:-1]) or None, "children": [], "cards": []}
+            if len(parts) > 1:
+                add_category(parts[:-1])["children"].append(key)
+        return categories[key]
+
+    for root_name in SOURCE_DIRS:
+        for dirpath, dirnames, filenames in os.walk(assets_dir / root_name):
+            dirnames.sort()
+            directory = Path(dirpath)
+            files = sorted(directory / name for name in filenames)
+            images = [f for f in files if f.suffix.lower() in IMAGE_EXTENSIONS]
+            audio = [f for f in files if f.suffix.lower() in AUDIO_EXTENSIONS]
+            if not images and not audio:
+                continue
+
+            rel = directory.relative_to(assets_dir).as_posix()
+            parts = [clean(p) for p in directory.relative_to(assets_dir).parts]
+            category, label = "/".join(parts[:-1]), parts[-1]
+            if CYRILLIC.search(label) and LATIN.search(label):
+                problems.append(f"{rel}: в названии смешаны кириллица и латиница")
+            cid = card_id(category, label)
+            if cid in cards:
+                problems.append(f"{rel}: ID {cid} уже занят карточкой {cards[cid]['dir']}")
+                continue
+
+            image = None
+            if images:
+                if len(images) > 1:
+                    problems.append(f"{rel}: несколько картинок, берется {images[0].name}")
+                image = media_entry(images[0], assets_dir)
+                source = derived["sources"].get(image["path"])
+                if source:
+                    image.update(width=source["width"], height=source["height"], variants=source["variants"])
+            else:
+                problems.append(f"{rel}: нет картинки")
+
+            sounds = {}
+            for path in audio:
+                lang = audio_language(path)
+                if lang in sounds:
+                    problems.append(f"{rel}: второй звук для {lang} ({path.name}) пропущен")
+                    continue
+                sounds[lang] = media_entry(path, assets_dir)
+                source = normalized["sources"].get(sounds[lang]["path"])
+                if source:
+                    sounds[lang]["variants"] = source["variants"]
+            if not sounds:
+                problems.append(f"{rel}: нет звука")
+
+            card = {"id": cid, "category": category, "label": label, "dir": rel, "image": image, "audio": sounds}
+            # Хеш карточки меняется при любом изменении ее файлов: по нему клиент докачивает только новое
+            card["hash"] = hashlib.sha256(json.dumps(card, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+            cards[cid] = card
+            add_category(parts[:-1])["cards"].append(cid)
+
+    body = {"categories": categories, "cards": cards}
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+    manifest = {"version": MANIFEST_VERSION, "content_hash": digest, "generated_at": int(time.time()), **body}
+    return manifest, problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=Path, default=ASSETS_DIR)
+    parser.add_argument("--output", type=Path, default=None, help=f"по умолчанию - assets/{MANIFEST_NAME}")
+    parser.add_argument("--strict", action="store_true", help="ошибка, если найдены проблемы")
+    args = parser.parse_args()
+
+    manifest, problems = build_manifest(args.assets)
+    output = args.output or args.assets / MANIFEST_NAME
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, output)
+
+    for problem in problems:
+        print("⚠", problem)
+    print(f"{len(manifest['cards'])} карточек в {len(manifest['categories'])} категориях, "
+          f"{output.stat().st_size / 1024:.1f} KB, проблем: {len(problems)}")
+    if args.strict and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import hashlib
+import json
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ASSETS_DIR = ROOT_DIR / "assets"
+# Папки с карточками внутри assets/
+SOURCE_DIRS = ("Коммуникация", "world_of_things")
+DERIVED_DIR_NAME = "_derived"
+DERIVED_INDEX_NAME = "index.json"
+DERIVED_INDEX_VERSION = 2
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+AUDIO_EXTENSIONS = {".mp3"}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_derived_index(path):
+    """Индекс tools.build_derivatives или None, если его нет или он другой версии."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == DERIVED_INDEX_VERSION else None
@@ -0,0 +1,145 @@
+"""Нормализация звуков карточек: одна громкость, без тишины в начале, малый битрейт.
+
+Каждый MP3 из assets/Коммуникация и assets/world_of_things прогоняется
+через ffmpeg: loudnorm (EBU R128, --lufs), silenceremove в начале,
+моно, затем кодирование в каждом формате из --formats. Результаты
+лежат в assets/_derived/audio/ под именами по хешу содержимого, список -
+в assets/_derived/audio.json. Как и картинки, пересобираются только
+изменившиеся файлы. Нужен ffmpeg в PATH.
+
+Запуск из корня репозитория:
+    python -m tools.normalize_audio --workers 4
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tools.common import ASSETS_DIR, AUDIO_EXTENSIONS, DERIVED_DIR_NAME, SOURCE_DIRS, file_hash
+
+AUDIO_INDEX_NAME = "audio.json"
+AUDIO_INDEX_VERSION = 2
+AUDIO_DIR_NAME = "audio"
+DEFAULT_LUFS = -16.0
+# Все, что тише, в начале клипа считается тишиной
+SILENCE_THRESHOLD_DB = -50
+SAMPLE_RATE = 22050
+# Кодек и битрейт каждого формата; MP3 играется везде, Opus - компактнее
+CODECS = {
+    "mp3": (["-c:a", "libmp3lame", "-b:a", "48k"], ".mp3"),
+    "opus": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip"], ".ogg"),
+}
+
+
+def find_sources(assets_dir):
+    sources = []
+    for name in SOURCE_DIRS:
+        for path in sorted((assets_dir / name).rglob("*")):
+            if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS:
+                sources.append(path)
+    return sources
+
+
+def audio_filter(lufs):
+    return ",".join([
+        f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD_DB}dB:start_silence=0.05",
+        f"loudnorm=I={lufs}:TP=-1.5:LRA=11",
+    ])
+
+
+def normalize_one(job):
+    """Кодирует один звук во все форматы. Выполняется в процессе пула."""
+    source, digest, out_dir, formats, lufs = job
+    variants = []
+    for fmt in formats:
+        codec, ext = CODECS[fmt]
+        name = f"{AUDIO_DIR_NAME}/{digest[:2]}/{digest[:16]}{ext}"
+        target = Path(out_dir) / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Одинаковые звуки дают одинаковые имена: временный файл свой у каждого процесса
+        tmp = target.with_name(f"{target.stem}.{os.getpid()}.tmp{ext}")
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", source,
+             "-af", audio_filter(lufs), "-ac", "1", "-ar", str(SAMPLE_RATE), "-map_metadata", "-1",
+             *codec, str(tmp)],
+            check=True,
+        )
+        os.replace(tmp, target)
+        variants.append({"format": fmt, "path": name, "bytes": target.stat().st_size, "hash": file_hash(target)})
+    return {"hash": digest, "variants": variants}
+
+
+def load_index(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == AUDIO_INDEX_VERSION else None
+
+
+def normalize(assets_dir=ASSETS_DIR, formats=("mp3",), lufs=DEFAULT_LUFS, workers=None, force=False):
+    """-> (index, сколько звуков перекодировано)."""
+    out_dir = assets_dir / DERIVED_DIR_NAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    params = {"formats": list(formats), "lufs": lufs, "codecs": {f: CODECS[f][0] for f in formats}}
+
+    old = load_index(out_dir / AUDIO_INDEX_NAME)
+    old_sources = old["sources"] if old and old.get("params") == params and not force else {}
+
+    sources, jobs = {}, []
+    for path in find_sources(assets_dir):
+        rel = path.relative_to(assets_dir).as_posix()
+        digest = file_hash(path)
+        entry = old_sources.get(rel)
+        if entry and entry["hash"] == digest and all((out_dir / v["path"]).exists() for v in entry["variants"]):
+            sources[rel] = entry
+        else:
+            jobs.append((rel, (str(path), digest, str(out_dir), list(formats), lufs)))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (rel, _), entry in zip(jobs, pool.map(normalize_one, [job for _, job in jobs])):
+                sources[rel] = entry
+
+    keep = {v["path"] for entry in sources.values() for v in entry["variants"]}
+    audio_dir = out_dir / AUDIO_DIR_NAME
+    if audio_dir.exists():
+        for path in audio_dir.rglob("*"):
+            if path.is_file() and path.relative_to(out_dir).as_posix() not in keep:
+                path.unlink()
+
+    index = {"version": AUDIO_INDEX_VERSION, "params": params, "sources": dict(sorted(sources.items()))}
+    tmp = out_dir / (AUDIO_INDEX_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, out_dir / AUDIO_INDEX_NAME)
+    return index, len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=Path, default=ASSETS_DIR)
+    parser.add_argument("--formats", nargs="+", choices=sorted(CODECS), default=["mp3"])
+    parser.add_argument("--lufs", type=float, default=DEFAULT_LUFS, help="целевая громкость, LUFS")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле (по умолчанию - по числу ядер)")
+    parser.add_argument("--force", action="store_true", help="перекодировать все, не глядя на audio.json")
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        sys.exit("ffmpeg не найден в PATH")
+    start = time.perf_counter()
+    index, rebuilt = normalize(args.assets, args.formats, args.lufs, args.workers, args.force)
+    original = sum((args.assets / rel).stat().st_size for rel in index["sources"])
+    normalized = sum(v["bytes"] for entry in index["sources"].values() for v in entry["variants"] if v["format"] == args.formats[0])
+    print(f"{len(index['sources'])} звуков, перекодировано {rebuilt} за {time.perf_counter() - start:.1f} с; "
+          f"оригиналы {original / 1e6:.1f} MB, {args.formats[0]} {normalized / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()